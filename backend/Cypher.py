@@ -15,8 +15,11 @@ def to_base64_and_latin1(matrix):
     base64_encoded = base64.b64encode(byte_array).decode('latin1')
     return base64_encoded
 
-def encrypt_block(matrix, round_keys, sbox):
-    """Encrypt a single block of data using the provided round keys and S-Box."""
+def encrypt_block(matrix, round_keys, sbox, trace=True):
+    """Encrypt a single block of data using the provided round keys and S-Box.
+
+    When trace is False the per-round details are not built and an empty list is returned.
+    """
     state = [row[:] for row in matrix]
     round_details = []  # To store per-round details
 
@@ -28,12 +31,13 @@ def encrypt_block(matrix, round_keys, sbox):
 
     # Initial AddRoundKey
     state = add_round_key(state, round_keys[0])
-    round_details.append({
-        'round': 0,
-        'text_state': to_base64_and_latin1(state),  # Convert to Base64 and then Latin1
-        'key_character': chr(round_keys[0][0][0]),  # Convert key byte to Latin1 character
-        'current_character': to_base64_and_latin1(matrix)[:4]  # First few characters affected
-    })
+    if trace:
+        round_details.append({
+            'round': 0,
+            'text_state': to_base64_and_latin1(state),  # Convert to Base64 and then Latin1
+            'key_character': chr(round_keys[0][0][0]),  # Convert key byte to Latin1 character
+            'current_character': to_base64_and_latin1(matrix)[:4]  # First few characters affected
+        })
 
     # Main Rounds (Rounds 1 to 13)
     for round in range(1, 14):
@@ -43,24 +47,26 @@ def encrypt_block(matrix, round_keys, sbox):
         state = add_round_key(state, round_keys[round])
 
         # Collect round information
-        round_details.append({
-            'round': round,
-            'text_state': to_base64_and_latin1(state),  # Convert to Base64 and then Latin1
-            'key_character': chr(round_keys[round][0][0]),  # Convert key byte to Latin1 character
-            'current_character': to_base64_and_latin1(state)[:4]  # Affected characters
-        })
+        if trace:
+            round_details.append({
+                'round': round,
+                'text_state': to_base64_and_latin1(state),  # Convert to Base64 and then Latin1
+                'key_character': chr(round_keys[round][0][0]),  # Convert key byte to Latin1 character
+                'current_character': to_base64_and_latin1(state)[:4]  # Affected characters
+            })
 
     # Final Round (without MixColumns)
     state = apply_sbox(state, sbox)
     state = shift_rows(state)
     state = add_round_key(state, round_keys[14])
 
-    round_details.append({
-        'round': 14,
-        'text_state': to_base64_and_latin1(state),  # Convert to Base64 and then Latin1
-        'key_character': chr(round_keys[14][0][0]),
-        'current_character': to_base64_and_latin1(state)[:4]
-    })
+    if trace:
+        round_details.append({
+            'round': 14,
+            'text_state': to_base64_and_latin1(state),  # Convert to Base64 and then Latin1
+            'key_character': chr(round_keys[14][0][0]),
+            'current_character': to_base64_and_latin1(state)[:4]
+        })
 
     # Return the encrypted matrix, bitshift bits matrix, and round details
     return state, bitshift_bits_matrix, round_details
@@ -93,6 +99,22 @@ def decrypt_block(encrypted_matrix, bitshift_bits_matrix, round_keys, inverse_sb
     return state
 
 
-
-
-
+def encrypt_bytes(data, context):
+    """Cipher backend entry point: encrypt padded bytes with a KeyContext, returning the ciphertext bytes."""
+    ciphertext = bytearray()
+    for start in range(0, len(data), 16):
+        matrix = [[data[start + col * 4 + row] for col in range(4)] for row in range(4)]
+        state, _, _ = encrypt_block(matrix, context.round_keys, context.sbox, trace=False)
+        ciphertext.extend(state[row][col] for col in range(4) for row in range(4))
+    return bytes(ciphertext)
+
+
+def decrypt_bytes(data, bitshift_bits, context):
+    """Cipher backend entry point: decrypt ciphertext bytes given their bitshift bits in text order."""
+    plaintext = bytearray()
+    for start in range(0, len(data), 16):
+        matrix = [[data[start + col * 4 + row] for col in range(4)] for row in range(4)]
+        bits = [[bitshift_bits[start + col * 4 + row] for col in range(4)] for row in range(4)]
+        state = decrypt_block(matrix, bits, context.round_keys, context.inverse_sbox)
+        plaintext.extend(state[row][col] for col in range(4) for row in range(4))
+    return bytes(plaintext)
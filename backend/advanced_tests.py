@@ -0,0 +1,180 @@
+import base64
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy.stats import chisquare, skew, kurtosis
+
+from Cypher import encrypt_block
+from encryption import encrypt, get_key_context
+from matrix_operations import split_string_to_column_major_matrix, merge_matrices_to_text
+from utils import pad_text
+
+
+class CiphertextView:
+    """
+    Decoded forms of the encrypted text shared by every test of the battery.
+    The text is converted once instead of once per test.
+    """
+
+    def __init__(self, encrypted_text):
+        self.text = encrypted_text
+        self.values = np.frombuffer(encrypted_text.encode('latin1'), dtype=np.uint8)
+        self.bits = np.unpackbits(self.values)
+        self.counts = np.bincount(self.values, minlength=256)
+
+
+def calculate_entropy(view):
+    data_length = view.values.size
+    if data_length == 0:
+        return 0
+    probabilities = view.counts[view.counts > 0] / data_length
+    return float(-np.sum(probabilities * np.log2(probabilities)))
+
+
+def frequency_analysis(view):
+    return {chr(value): int(view.counts[value]) for value in np.flatnonzero(view.counts)}
+
+
+def diffusion_test(text, modified_text, key_bytes, encrypted_text):
+    """
+    Percentage of ciphertext characters that change when the input text is modified.
+    Blocks are encrypted independently, so only the blocks touched by the modification
+    are encrypted again and the rest of the ciphertext is reused from encrypted_text.
+    """
+    padded_text = pad_text(text)
+    modified_padded_text = pad_text(modified_text)
+
+    if len(padded_text) != len(modified_padded_text):
+        # Different padding, every block may change
+        modified_encrypted_text, _, _ = encrypt(modified_text, key_bytes, trace=False)
+    else:
+        context = get_key_context(bytes(key_bytes))
+        round_keys, sbox = context.round_keys, context.sbox
+        encrypted_bytes = bytearray(base64.b64decode(encrypted_text))
+        for block_start in range(0, len(padded_text), 16):
+            block = modified_padded_text[block_start:block_start + 16]
+            if block == padded_text[block_start:block_start + 16]:
+                continue
+            matrix = split_string_to_column_major_matrix(block)[0]
+            encrypted_matrix, _, _ = encrypt_block(matrix, round_keys, sbox, trace=False)
+            encrypted_bytes[block_start:block_start + 16] = merge_matrices_to_text([encrypted_matrix]).encode('latin1')
+        modified_encrypted_text = base64.b64encode(encrypted_bytes).decode('ascii')
+
+    length = min(len(encrypted_text), len(modified_encrypted_text))
+    first = np.frombuffer(encrypted_text[:length].encode('latin1'), dtype=np.uint8)
+    second = np.frombuffer(modified_encrypted_text[:length].encode('latin1'), dtype=np.uint8)
+    differences = int(np.count_nonzero(first != second))
+    return (differences / max(len(encrypted_text), len(modified_encrypted_text))) * 100
+
+
+def bitwise_distribution_test(view):
+    one_count = int(np.count_nonzero(view.bits))
+    return {'0s': int(view.bits.size - one_count), '1s': one_count}
+
+
+def hamming_distance_test(view):
+    distances = np.unpackbits(view.values[:-1] ^ view.values[1:]).reshape(-1, 8).sum(axis=1)
+    return {'average_distance': np.mean(distances), 'max_distance': int(distances.max())}
+
+
+def chi_squared_test(view):
+    observed_values = view.counts[view.counts > 0]
+    total_count = observed_values.sum()
+    expected_freq = total_count / len(observed_values)  # Calculate average frequency for each unique character
+    expected_values = [expected_freq] * len(observed_values)  # Expected values based on uniform distribution
+
+    # Perform Chi-squared test
+    chi2, p = chisquare(observed_values, f_exp=expected_values)
+    return {'chi_squared': chi2, 'p_value': p}
+
+
+def serial_correlation_test(view):
+    n = view.values.size
+    if n < 2:
+        return 0
+    centered = view.values - view.values.mean()
+    denom = np.dot(centered, centered)
+    return float(np.dot(centered[:-1], centered[1:]) / denom) if denom != 0 else 0
+
+
+def run_length_test(view):
+    # Runs end wherever the next bit differs
+    boundaries = np.flatnonzero(np.diff(view.bits)) + 1
+    runs = np.diff(np.concatenate(([0], boundaries, [view.bits.size])))
+    return {'average_run_length': np.mean(runs), 'max_run_length': int(runs.max())}
+
+
+def block_entropy_tests(view, block_size=16):
+    """Calculates entropy for each block of a given size in the encrypted text."""
+    num_blocks = view.values.size // block_size
+    blocks = view.values[:num_blocks * block_size].reshape(num_blocks, block_size)
+    # Count each (block, value) pair once for all blocks together
+    keys = np.arange(num_blocks).repeat(block_size) * 256 + blocks.ravel()
+    unique_keys, counts = np.unique(keys, return_counts=True)
+    probabilities = counts / block_size
+    entropies = np.bincount(unique_keys // 256, weights=-probabilities * np.log2(probabilities), minlength=num_blocks)
+    return {'average_block_entropy': np.mean(entropies), 'max_block_entropy': entropies.max()}
+
+
+def skewness_and_kurtosis_test(view):
+    """Calculates skewness and kurtosis of the character distribution."""
+    return {'skewness': skew(view.values), 'kurtosis': kurtosis(view.values)}
+
+
+def autocorrelation_test(view):
+    """Performs an autocorrelation test on the character sequence."""
+    centered = view.values - view.values.mean()
+    return np.dot(centered[:-1], centered[1:]) / np.dot(centered, centered)
+
+
+CIPHERTEXT_TESTS = {
+    "entropy": calculate_entropy,
+    "frequency_analysis": frequency_analysis,
+    "bitwise_distribution": bitwise_distribution_test,
+    "hamming_distance": hamming_distance_test,
+    "chi_squared_uniformity": chi_squared_test,
+    "serial_correlation": serial_correlation_test,
+    "run_length": run_length_test,
+    "block_entropy": block_entropy_tests,
+    "skewness_and_kurtosis": skewness_and_kurtosis_test,
+    "autocorrelation": autocorrelation_test,
+}
+
+
+def _timed(func, *args):
+    start_time = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - start_time) * 1e3  # Milliseconds
+
+
+# Shared by every call, so concurrent requests queue on the same four threads instead of each
+# starting its own pool; the threads are started on demand and then reused
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='advanced-tests')
+
+
+def run_advanced_tests(input_text, key_bytes, encrypted_text, parallel=True):
+    """
+    Run the whole test battery on encrypted_text concurrently, or one test after the other on
+    the calling thread if parallel is False (profilers only see the thread they run on).
+    Returns the results and the time each test took in milliseconds.
+    """
+    view = CiphertextView(encrypted_text)
+    tests = {
+        "diffusion_percentage": (diffusion_test, input_text, input_text[:-1] + "?", key_bytes, encrypted_text)
+    }
+    for name, test in CIPHERTEXT_TESTS.items():
+        tests[name] = (test, view)
+
+    results = {}
+    timings = {}
+    if not parallel:
+        for name, call in tests.items():
+            results[name], timings[name] = _timed(*call)
+        return results, timings
+
+    futures = {name: _executor.submit(_timed, *call) for name, call in tests.items()}
+    for name, future in futures.items():
+        results[name], timings[name] = future.result()
+
+    return results, timings
@@ -0,0 +1,118 @@
+import importlib.util
+import os
+import threading
+import tracemalloc
+
+from backends import REFERENCE, ensure_tuned, select_backend
+from encryption import encrypt_with_context, get_key_context
+from utils import pad_text
+
+# Modules whose allocations are reported, one stage per module: the reference cipher and the
+# backend engines. An allocation belongs to the innermost Python frame, so allocations made by
+# numpy on behalf of an engine line count for that line, those made inside base64 do not.
+# Modules are matched by file, so same-named modules of other packages (werkzeug's utils) are not
+STAGE_MODULES = ('Cypher', 'utils', 'matrix_operations', 'encryption', 'state', 'batch_engine', 'bitsliced')
+_STAGE_FILES = {}
+for _name in STAGE_MODULES:
+    _spec = importlib.util.find_spec(_name)
+    if _spec is not None and _spec.origin:
+        _STAGE_FILES[os.path.abspath(_spec.origin)] = _name
+_STAGE_FILTERS = [tracemalloc.Filter(True, f"*{os.sep}{os.path.basename(path)}") for path in _STAGE_FILES]
+
+# tracemalloc is process-wide, so profiles run one at a time
+_profile_lock = threading.Lock()
+
+
+def _stage_snapshot():
+    return tracemalloc.take_snapshot().filter_traces(_STAGE_FILTERS)
+
+
+def _profiled_run(input_text, context, trace, backend):
+    """The encryption every run repeats and the name of the backend doing it."""
+    if not trace:
+        try:
+            data = pad_text(input_text).encode('latin1')
+        except UnicodeEncodeError:
+            data = None
+        if data is not None:
+            # The engine is called directly: from the second run on the block memo would serve
+            # short messages without running it
+            engine = select_backend(len(data) // 16, backend)
+            return lambda: engine.encrypt_bytes(data, context), engine.name
+    return lambda: encrypt_with_context(input_text, context, trace), REFERENCE
+
+
+def allocation_profile(input_text, key_bytes, num_runs=10, trace=False, backend=None, top=10):
+    """
+    Allocation profile of encrypt restricted to the stage modules (STAGE_MODULES).
+
+    Every run sits between two tracemalloc snapshots; their diff gives the allocations of the
+    stage modules still alive at the end of the run, i.e. the result and what it references.
+    The peak traced memory above the baseline gives the memory the run needed, temporaries
+    included. Without trace the blocks go through the cipher backend encrypt would choose, or
+    backend. Other threads running cipher code meanwhile are counted as well.
+    Results are per block and per stage (module), plus the top allocating lines.
+    """
+    num_blocks = len(pad_text(input_text)) // 16
+    context = get_key_context(key_bytes)
+
+    with _profile_lock:
+        # An autotune run in progress would allocate in the backend modules
+        ensure_tuned()
+        run, backend_name = _profiled_run(input_text, context, trace, backend)
+        # Warm up so one-time setup is not attributed to the runs
+        run()
+
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start()
+        try:
+            peaks = []
+            lines = {}
+            for _ in range(num_runs):
+                baseline = _stage_snapshot()
+                tracemalloc.reset_peak()
+                current_before, _ = tracemalloc.get_traced_memory()
+                result = run()
+                _, peak = tracemalloc.get_traced_memory()
+                peaks.append(peak - current_before)
+
+                for stat in _stage_snapshot().compare_to(baseline, 'lineno'):
+                    frame = stat.traceback[0]
+                    stage = _STAGE_FILES.get(os.path.abspath(frame.filename))
+                    if stage is not None:
+                        count, size = lines.get((stage, frame.lineno), (0, 0))
+                        lines[(stage, frame.lineno)] = (count + stat.count_diff, size + stat.size_diff)
+                del result, baseline
+        finally:
+            if not was_tracing:
+                tracemalloc.stop()
+
+    per_block = num_runs * num_blocks
+    stages = dict.fromkeys(STAGE_MODULES, (0, 0))
+    for (stage, _), (count, size) in lines.items():
+        stages[stage] = (stages[stage][0] + count, stages[stage][1] + size)
+    top_lines = sorted(lines.items(), key=lambda item: item[1][1], reverse=True)[:top]
+
+    return {
+        'runs': num_runs,
+        'blocks': num_blocks,
+        'trace': trace,
+        'backend': backend_name,
+        'peak_kb': {
+            'mean': sum(peaks) / len(peaks) / 1024,
+            'max': max(peaks) / 1024,
+        },
+        'peak_kb_per_block': sum(peaks) / len(peaks) / 1024 / num_blocks,
+        'allocations_per_block': sum(count for count, _ in stages.values()) / per_block,
+        'kb_per_block': sum(size for _, size in stages.values()) / 1024 / per_block,
+        'stages': {
+            module: {'allocations_per_block': count / per_block, 'kb_per_block': size / 1024 / per_block}
+            for module, (count, size) in stages.items()
+        },
+        'top_lines': [
+            {'line': f"{stage}:{lineno}", 'allocations_per_block': count / per_block,
+             'kb_per_block': size / 1024 / per_block}
+            for (stage, lineno), (count, size) in top_lines
+        ],
+    }
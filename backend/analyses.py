@@ -0,0 +1,206 @@
+import importlib
+import importlib.util
+import os
+import threading
+
+
+class UnknownAnalysis(KeyError):
+    pass
+
+
+class AnalysisUnavailable(RuntimeError):
+    pass
+
+
+class AnalysisPlugin:
+    """
+    An analysis implemented by module.function. The module, and the heavy dependencies it
+    imports, are only loaded the first time the analysis runs. Availability is checked without
+    importing anything: every module in requires must be installed and check, if given, must
+    return True.
+
+    Side-channel analyses also have arguments(data, key_bytes), which turns the JSON body of
+    /api/side_channel_test into the (args, kwargs) of the call and raises ValueError on bad input.
+    """
+
+    def __init__(self, name, module, function, kind, description, requires=(), check=None, arguments=None):
+        self.name = name
+        self.module = module
+        self.function = function
+        self.kind = kind
+        self.description = description
+        self.requires = tuple(requires)
+        self.check = check
+        self.arguments = arguments
+        self._implementation = None
+        self._lock = threading.Lock()
+
+    def missing(self):
+        return [module for module in self.requires if importlib.util.find_spec(module) is None]
+
+    def available(self):
+        return not self.missing() and (self.check is None or self.check())
+
+    def load(self):
+        if self._implementation is None:
+            with self._lock:
+                if self._implementation is None:
+                    missing = self.missing()
+                    if missing:
+                        raise AnalysisUnavailable(f"Analysis '{self.name}' requires {', '.join(missing)}")
+                    if self.check is not None and not self.check():
+                        raise AnalysisUnavailable(f"Analysis '{self.name}' is not available on this host")
+                    self._implementation = getattr(importlib.import_module(self.module), self.function)
+        return self._implementation
+
+    def run(self, *args, **kwargs):
+        return self.load()(*args, **kwargs)
+
+    def describe(self):
+        return {
+            'name': self.name,
+            'kind': self.kind,
+            'description': self.description,
+            'requires': list(self.requires),
+            'missing': self.missing(),
+            'available': self.available(),
+            'loaded': self._implementation is not None,
+        }
+
+
+_registry = {}
+
+
+def register(plugin):
+    _registry[plugin.name] = plugin
+    return plugin
+
+
+def get_analysis(name):
+    try:
+        return _registry[name]
+    except KeyError:
+        raise UnknownAnalysis(name) from None
+
+
+def list_analyses(kind=None):
+    return [plugin for plugin in _registry.values() if kind is None or plugin.kind == kind]
+
+
+def run_side_channel_analysis(name, data, key_bytes):
+    """Run a side-channel analysis with the options found in a /api/side_channel_test body."""
+    plugin = get_analysis(name)
+    if plugin.kind != 'side_channel':
+        raise UnknownAnalysis(name)
+    args, kwargs = plugin.arguments(data, key_bytes)
+    return plugin.run(*args, **kwargs)
+
+
+def _int_option(data, name, default, low, high):
+    value = data.get(name, default)
+    if not isinstance(value, int) or not low <= value <= high:
+        raise ValueError(f"{name} must be an integer between {low} and {high}")
+    return value
+
+
+def _energy_counter_available():
+    # Mirrors energy.get_energy_backend without importing it
+    from powercap import POWERCAP_ROOT, find_rapl_domain
+
+    name = os.environ.get('ENERGY_BACKEND', 'rapl')
+    if name == 'file':
+        return bool(os.environ.get('ENERGY_FILE'))
+    return name == 'rapl' and find_rapl_domain(os.environ.get('POWERCAP_ROOT', POWERCAP_ROOT)) is not None
+
+
+def _timing_arguments(data, key_bytes):
+    num_samples = _int_option(data, 'num_samples', 20000, 100, 10_000_000)
+    return (data.get('input_text', ''), key_bytes, num_samples), {'cpu': data.get('cpu')}
+
+
+def _cache_arguments(data, key_bytes):
+    # The eviction mode is validated by cache_timing_profile
+    return (key_bytes,), {'eviction': data.get('eviction', 'full')}
+
+
+def _power_arguments(data, key_bytes):
+    # num_strings counted 10-character strings; samples of 4096 blocks are a different workload
+    if 'num_strings' in data:
+        raise ValueError("num_strings is no longer supported, use power_samples (4096 random blocks per sample)")
+    return (_int_option(data, 'power_samples', 1, 1, 100), key_bytes), {}
+
+
+def _text_arguments(data, key_bytes):
+    return (data.get('input_text', ''), key_bytes), {}
+
+
+def _memory_arguments(data, key_bytes):
+    from backends import select_backend, BackendUnavailable, UnknownBackend
+
+    trace = data.get('trace', False)
+    if not isinstance(trace, bool):
+        raise ValueError("trace must be true or false")
+    backend = data.get('backend')
+    if backend is not None:
+        if trace:
+            raise ValueError("backend only applies without trace, traced runs use the reference")
+        try:
+            select_backend(1, backend)
+        except UnknownBackend:
+            raise ValueError(f"Unknown backend '{backend}'") from None
+        except BackendUnavailable as e:
+            raise AnalysisUnavailable(str(e)) from None
+    num_runs = _int_option(data, 'num_runs', 10, 1, 100)
+    return (data.get('input_text', ''), key_bytes, num_runs), {'trace': trace, 'backend': backend}
+
+
+register(AnalysisPlugin(
+    'timing', 'timing_leakage', 'timing_leakage_analysis', 'side_channel',
+    'Fixed-vs-random TVLA timing test of the block engine',
+    arguments=_timing_arguments,
+))
+register(AnalysisPlugin(
+    'cache', 'cache_timing', 'cache_timing_profile', 'side_channel',
+    'Block timings after cache eviction, grouped by plaintext byte value',
+    requires=('numpy',), arguments=_cache_arguments,
+))
+register(AnalysisPlugin(
+    'power', 'energy', 'power_consumption_analysis', 'side_channel',
+    'Energy per block from a RAPL or file energy counter',
+    requires=('numpy',), check=_energy_counter_available, arguments=_power_arguments,
+))
+register(AnalysisPlugin(
+    'memory', 'allocation_profile', 'allocation_profile', 'side_channel',
+    'Allocations of the cipher modules per block and per stage',
+    arguments=_memory_arguments,
+))
+register(AnalysisPlugin(
+    'hamming', 'hamming_weight', 'hamming_weight_analysis', 'side_channel',
+    'Hamming weight of every ciphertext block',
+    arguments=_text_arguments,
+))
+register(AnalysisPlugin(
+    'advanced_tests', 'advanced_tests', 'run_advanced_tests', 'statistical',
+    'Randomness and diffusion test battery of a ciphertext',
+    requires=('numpy', 'scipy'),
+))
+register(AnalysisPlugin(
+    'avalanche', 'avalanche', 'avalanche_analysis', 'statistical',
+    'Strict avalanche criterion over flipped plaintext bits',
+    requires=('numpy',),
+))
+register(AnalysisPlugin(
+    'key_avalanche', 'key_avalanche', 'key_avalanche_analysis', 'statistical',
+    'Ciphertext, S-Box and round key sensitivity to flipped key bits',
+    requires=('numpy',),
+))
+register(AnalysisPlugin(
+    'sbox_profile', 'sbox_analysis', 'sbox_profile', 'statistical',
+    'Differential and linear profile of a key-dependent S-Box',
+    requires=('numpy',),
+))
+register(AnalysisPlugin(
+    'cpa', 'cpa', 'cpa_attack', 'statistical',
+    'Correlation power analysis of simulated first-round traces',
+    requires=('numpy',),
+))
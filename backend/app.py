@@ -1,107 +1,54 @@
-import base64
+import hmac
 import json
-import math
+import os
 import queue
-import random
-import string
 import threading
-import time
-from collections import Counter
-from flask import Flask, jsonify, request, Response
+from flask import Flask, jsonify, request, Response, stream_with_context
 from flask_cors import CORS
 import secrets
-from encryption import encrypt
-from encryption import decrypt
-import numpy as np
-from scipy.stats import chisquare, skew, kurtosis
-import pyRAPL
-import tracemalloc
-import wmi
-import win32com.client
-import requests
+from encryption import encrypt, encrypt_with_context, pack_encryption, unpack_encryption
+from encryption import trace_rounds, trace_ciphertext_rounds, encrypt_stream, decrypt_stream, STREAM_RECORD_SIZE
+from encryption import decrypt, decrypt_with_context
+from key_store import get_key_store, UnknownKey
+from backends import backend_report, get_backend, select_backend, start_backends, BackendUnavailable, UnknownBackend
+from result_cache import cache_key, cache_stats, get_cache, pack_json, unpack_json
+from sbox import generate_key_dependent_sbox
+from analyses import (get_analysis, list_analyses, run_side_channel_analysis,
+                      AnalysisUnavailable, UnknownAnalysis)
 
 
 app = Flask(__name__)
 CORS(app, resources={r"/api/*": {"origins": "http://localhost:3000"}})
 
-# Generate a secure random 256-bit key (32 bytes)
-key_bytes = bytes(secrets.token_bytes(32))
-
-# Utility functions for testing
-def calculate_entropy(data):
-    data_length = len(data)
-    if data_length == 0:
-        return 0
-    counts = Counter(data)
-    entropy = -sum((count / data_length) * math.log2(count / data_length) for count in counts.values())
-    return entropy
-
-def frequency_analysis(encrypted_text):
-    return dict(Counter(encrypted_text))
-
-def diffusion_test(text, modified_text, key_bytes):
-    encrypted_text1, _, _ = encrypt(text, key_bytes)
-    encrypted_text2, _, _ = encrypt(modified_text, key_bytes)
-    differences = sum(1 for a, b in zip(encrypted_text1, encrypted_text2) if a != b)
-    return (differences / max(len(encrypted_text1), len(encrypted_text2))) * 100
-
-def bitwise_distribution_test(encrypted_text):
-    binary_text = ''.join(format(ord(c), '08b') for c in encrypted_text)
-    zero_count = binary_text.count('0')
-    one_count = binary_text.count('1')
-    return {'0s': zero_count, '1s': one_count}
-
-def hamming_distance_test(encrypted_text):
-    distances = []
-    for i in range(len(encrypted_text) - 1):
-        bin1 = format(ord(encrypted_text[i]), '08b')
-        bin2 = format(ord(encrypted_text[i+1]), '08b')
-        distances.append(sum(b1 != b2 for b1, b2 in zip(bin1, bin2)))
-    return {'average_distance': np.mean(distances), 'max_distance': max(distances)}
-
-def chi_squared_test(encrypted_text):
-    frequencies = Counter(encrypted_text)
-    observed_values = list(frequencies.values())
-    total_count = sum(observed_values)
-    expected_freq = total_count / len(frequencies)  # Calculate average frequency for each unique character
-    expected_values = [expected_freq] * len(frequencies)  # Expected values based on uniform distribution
-
-    # Perform Chi-squared test
-    chi2, p = chisquare(observed_values, f_exp=expected_values)
-    return {'chi_squared': chi2, 'p_value': p}
-
-def serial_correlation_test(encrypted_text):
-    n = len(encrypted_text)
-    if n < 2:
-        return 0
-    mean_val = sum(ord(c) for c in encrypted_text) / n
-    num = sum((ord(encrypted_text[i]) - mean_val) * (ord(encrypted_text[i+1]) - mean_val) for i in range(n - 1))
-    denom = sum((ord(c) - mean_val) ** 2 for c in encrypted_text)
-    return num / denom if denom != 0 else 0
-
-def run_length_test(encrypted_text):
-    binary_text = ''.join(format(ord(c), '08b') for c in encrypted_text)
-    runs = [len(run) for run in ''.join(binary_text).split('0') + ''.join(binary_text).split('1') if run]
-    return {'average_run_length': np.mean(runs), 'max_run_length': max(runs)}
-
-def block_entropy_tests(encrypted_text, block_size=16):
-    """Calculates entropy for each block of a given size in the encrypted text."""
-    num_blocks = len(encrypted_text) // block_size
-    entropies = [calculate_entropy(encrypted_text[i * block_size:(i + 1) * block_size]) for i in range(num_blocks)]
-    return {'average_block_entropy': np.mean(entropies), 'max_block_entropy': max(entropies)}
-
-def skewness_and_kurtosis_test(encrypted_text):
-    """Calculates skewness and kurtosis of the character distribution."""
-    values = [ord(c) for c in encrypted_text]
-    return {'skewness': skew(values), 'kurtosis': kurtosis(values)}
-
-def autocorrelation_test(encrypted_text):
-    """Performs an autocorrelation test on the character sequence."""
-    values = [ord(c) for c in encrypted_text]
-    n = len(values)
-    mean_val = np.mean(values)
-    autocorr = sum((values[i] - mean_val) * (values[i+1] - mean_val) for i in range(n-1)) / sum((v - mean_val) ** 2 for v in values)
-    return autocorr
+# Keys live in the keyring file and only their ids are sent to clients.
+# The first key of the keyring is the default; an empty keyring gets a secure random 256-bit key.
+# With SCREEN_KEYS set, keys whose key-dependent S-Box is weak are rejected
+key_store = get_key_store()
+default_key_id = None
+
+
+def generate_key():
+    """A secure random 256-bit key, screened for a weak S-Box when SCREEN_KEYS is set."""
+    if os.environ.get('SCREEN_KEYS'):
+        from sbox_analysis import generate_screened_key
+        return generate_screened_key()
+    return secrets.token_bytes(32)
+
+
+def start_app():
+    """
+    Open the default key, creating it if needed, and start the cipher backends: CIPHER_BACKEND
+    is checked and the backends are autotuned once, off the request path.
+    """
+    global default_key_id
+    default_key_id = key_store.default_key_id(generate_key)
+    start_backends()
+
+
+# Worker processes started with the 'spawn' method (timing_leakage) import the launching script
+# as __mp_main__; they must not write the keyring or run an autotune next to their measurements
+if __name__ != '__mp_main__':
+    start_app()
 
 @app.route('/api/encrypt', methods=['POST', 'OPTIONS'])
 def encrypt_text():
@@ -113,20 +60,176 @@ def encrypt_text():
         return jsonify({'error': 'No text provided'}), 400
 
     input_text = data['text']
+    key_id = data.get('key_id', default_key_id)
 
     try:
-        encrypted_text, bitshift_bits_matrices, rounds_data = encrypt(input_text, key_bytes)  # Use the encrypt function from cipher.py
-        print(encrypted_text)
+        context = key_store.get_context(key_id)
+        if data.get('backend'):
+            get_backend(data['backend'])
+
+        # Encryption is deterministic for a key, so identical requests are served from the result cache
+        cache = get_cache('results')
+        cached = cache.get(cache_key('encrypt', key_id, input_text)) if cache.enabled else None
+        if cached is None:
+            # Round details are fetched block by block from /api/rounds
+            result = encrypt_with_context(input_text, context, trace=False, backend=data.get('backend'))
+            if cache.enabled:
+                cache.put(cache_key('encrypt', key_id, input_text), pack_encryption(*result))
+        else:
+            result = unpack_encryption(cached)
+        encrypted_text, bitshift_bits_matrices, _ = result
 
         return jsonify({
             'encrypted_text': encrypted_text,
-            'key': key_bytes.hex(),
-            'bitshift_matrices': bitshift_bits_matrices,  # Include bitshift bits/matrices here
-            'rounds': rounds_data
+            'key_id': key_id,
+            'bitshift_matrices': bitshift_bits_matrices  # Include bitshift bits/matrices here
         })
+    except UnknownKey:
+        return jsonify({'error': 'Unknown key_id'}), 404
+    except UnknownBackend:
+        return jsonify({'error': 'Unknown backend'}), 400
+    except BackendUnavailable as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+# Binary streaming endpoints: largest accepted body and size of the reads from the request stream.
+# Only one chunk is in memory at a time, and the next one is read once the client has taken the output.
+STREAM_MAX_BYTES = int(os.environ.get('STREAM_MAX_BYTES', 1 << 30))
+STREAM_CHUNK_SIZE = int(os.environ.get('STREAM_CHUNK_SIZE', 1 << 16))
+
+# Errors found once the response has started can no longer change its status, so every stream
+# response ends with a trailer of this size: an 8-byte marker, STREAM_OK or STREAM_ERROR, then
+# for errors the UTF-8 message, NUL-padded and cut to fit. A response without it was cut short.
+STREAM_TRAILER_SIZE = 64
+STREAM_OK = b'STREAMOK'
+STREAM_ERROR = b'STREAMER'
+
+
+def _stream_trailer(error=None):
+    if error is None:
+        return STREAM_OK.ljust(STREAM_TRAILER_SIZE, b'\0')
+    message = error.encode('utf-8')[:STREAM_TRAILER_SIZE - len(STREAM_ERROR)]
+    return (STREAM_ERROR + message).ljust(STREAM_TRAILER_SIZE, b'\0')
+
+
+def _request_chunks():
+    total = 0
+    while True:
+        chunk = request.stream.read(STREAM_CHUNK_SIZE)
+        if not chunk:
+            return
+        total += len(chunk)
+        if total > STREAM_MAX_BYTES:
+            # Only reachable without a Content-Length; the error ends up in the trailer
+            raise ValueError(f'Request body exceeds {STREAM_MAX_BYTES} bytes')
+        yield chunk
+
+
+def _with_trailer(output):
+    try:
+        yield from output
+    except Exception as e:
+        yield _stream_trailer(str(e) or type(e).__name__)
+        return
+    yield _stream_trailer()
+
+
+def _stream_response(stream_function, record_size=None):
+    if request.content_length is not None and request.content_length > STREAM_MAX_BYTES:
+        return jsonify({'error': f'Request body exceeds {STREAM_MAX_BYTES} bytes'}), 413
+    if record_size and request.content_length is not None and request.content_length % record_size:
+        return jsonify({'error': f'Request body is not a whole number of {record_size}-byte records'}), 400
+
+    backend = request.args.get('backend')
+    try:
+        context = key_store.get_context(request.args.get('key_id', default_key_id))
+        if backend:
+            # Loads and self-checks a forced backend before the response starts
+            select_backend(1, backend)
+    except UnknownKey:
+        return jsonify({'error': 'Unknown key_id'}), 404
+    except UnknownBackend:
+        return jsonify({'error': 'Unknown backend'}), 400
+    except BackendUnavailable as e:
+        return jsonify({'error': str(e)}), 503
+
+    return Response(
+        stream_with_context(_with_trailer(stream_function(_request_chunks(), context, backend))),
+        mimetype='application/octet-stream',
+        headers={'X-Record-Size': str(STREAM_RECORD_SIZE), 'X-Trailer-Size': str(STREAM_TRAILER_SIZE)},
+    )
+
+
+@app.route('/api/encrypt_stream', methods=['POST'])
+def encrypt_binary_stream():
+    """
+    Encrypts the raw request body as it arrives, under the key_id query parameter.
+    The response is a stream of 20-byte records, one per block: 16 ciphertext bytes followed
+    by the block's bitshift bits packed into 4 bytes (4 pairs per byte, lowest bits first),
+    and then the STREAM_TRAILER_SIZE-byte trailer.
+    """
+    return _stream_response(encrypt_stream)
+
+
+@app.route('/api/decrypt_stream', methods=['POST'])
+def decrypt_binary_stream():
+    """
+    Decrypts a body of /api/encrypt_stream records (without the trailer) as it arrives and
+    streams back the plaintext, followed by the trailer.
+    """
+    return _stream_response(decrypt_stream, STREAM_RECORD_SIZE)
+
+
+# Most blocks whose round details one /api/rounds request returns
+MAX_ROUNDS_PAGE = 64
+
+
+@app.route('/api/rounds', methods=['POST', 'OPTIONS'])
+def round_trace():
+    """
+    Round details of a range of blocks, recomputed on demand.
+    The blocks come from 'text' (a plaintext) or from 'encrypted_text' and 'bitshift_matrices'
+    (a ciphertext), under 'key_id'. 'start' and 'limit' select the page of blocks.
+    """
+    if request.method == 'OPTIONS':
+        return jsonify({"message": "CORS preflight successful"}), 200
+
+    data = request.get_json(silent=True) or {}
+    key_id = data.get('key_id', default_key_id)
+    start = data.get('start', 0)
+    limit = data.get('limit', 1)
+
+    if not isinstance(start, int) or start < 0:
+        return jsonify({'error': 'start must be a non-negative integer'}), 400
+    if not isinstance(limit, int) or not 1 <= limit <= MAX_ROUNDS_PAGE:
+        return jsonify({'error': f'limit must be an integer between 1 and {MAX_ROUNDS_PAGE}'}), 400
+
+    try:
+        context = key_store.get_context(key_id)
+        if 'text' in data:
+            total_blocks, rounds_data = trace_rounds(data['text'], context, start, limit)
+        elif 'encrypted_text' in data and 'bitshift_matrices' in data:
+            total_blocks, rounds_data = trace_ciphertext_rounds(
+                data['encrypted_text'], data['bitshift_matrices'], context, start, limit)
+        else:
+            return jsonify({'error': 'Provide text, or encrypted_text and bitshift_matrices'}), 400
+    except UnknownKey:
+        return jsonify({'error': 'Unknown key_id'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+    count = max(0, min(limit, total_blocks - start))
+    return jsonify({
+        'key_id': key_id,
+        'total_blocks': total_blocks,
+        'start': start,
+        'count': count,
+        'next_start': start + count if start + count < total_blocks else None,
+        'rounds': rounds_data,
+    })
+
 
 @app.route('/api/advanced_test_encryption', methods=['POST', 'OPTIONS'])
 def advanced_test_encryption():
@@ -134,59 +237,147 @@ def advanced_test_encryption():
         return jsonify({"message": "CORS preflight successful"}), 200
 
     data = request.get_json()
-    print("Data received for testing:", data)  # Debug print
-
     if not data or 'text' not in data:
         return jsonify({'error': 'No text provided'}), 400
 
     input_text = data['text']
-    print("Input text for encryption:", input_text)  # Debug print
 
-    key_bytes = secrets.token_bytes(32)
-    print("Generated key for testing:", key_bytes.hex())  # Debug print
+    # Tests run under a keyring key, so the results are deterministic and can be cached
+    key_id = data.get('key_id', default_key_id)
 
     try:
+        key_bytes = key_store.get_key(key_id)
+        cache = get_cache('results')
+        cached = cache.get(cache_key('advanced_tests', key_id, input_text)) if cache.enabled else None
+        if cached is not None:
+            return jsonify({'status': 'success', 'cached': True, **unpack_json(cached)})
+
         # Encrypt the text for testing
-        encrypted_text, bitshift_bits_matrices, _ = encrypt(input_text, key_bytes)
-        print("Encrypted text:", encrypted_text)  # Debug print
-
-        # Run all tests
-        results = {
-            "entropy": calculate_entropy(encrypted_text),
-            "frequency_analysis": frequency_analysis(encrypted_text),
-            "diffusion_percentage": diffusion_test(input_text, input_text[:-1] + "?", key_bytes),
-            "bitwise_distribution": bitwise_distribution_test(encrypted_text),
-            "hamming_distance": hamming_distance_test(encrypted_text),
-            "chi_squared_uniformity": chi_squared_test(encrypted_text),
-            "serial_correlation": serial_correlation_test(encrypted_text),
-            "run_length": run_length_test(encrypted_text),
-            "block_entropy": block_entropy_tests(encrypted_text),
-            "skewness_and_kurtosis": skewness_and_kurtosis_test(encrypted_text),
-            "autocorrelation": autocorrelation_test(encrypted_text)
-        }
+        encrypted_text, bitshift_bits_matrices, _ = encrypt(input_text, key_bytes, trace=False)
 
-        print("Test results:", results)  # Debug print
-        return jsonify({
-            'status': 'success',
+        # Run all tests concurrently on a shared decoding of the ciphertext
+        results, timings = get_analysis('advanced_tests').run(input_text, key_bytes, encrypted_text)
+
+        response = {
             'results': results,
+            'key_id': key_id,
             'encrypted_text': encrypted_text,
             'bitshift_matrices': bitshift_bits_matrices  # Include bitshift bits/matrices here
-        })
+        }
+        # Timings describe this run only, so cached responses come without them
+        if cache.enabled:
+            cache.put(cache_key('advanced_tests', key_id, input_text), pack_json(response))
+        return jsonify({'status': 'success', 'cached': False, 'timings_ms': timings, **response})
+    except UnknownKey:
+        return jsonify({'error': 'Unknown key_id'}), 404
+    except AnalysisUnavailable as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        app.logger.exception('Advanced testing failed')
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/avalanche', methods=['POST', 'OPTIONS'])
+def avalanche_test():
+    if request.method == 'OPTIONS':
+        return jsonify({"message": "CORS preflight successful"}), 200
+
+    data = request.get_json(silent=True) or {}
+    num_blocks = data.get('num_blocks', 64)
+    seed = data.get('seed')
+
+    # Every block is encrypted 129 times (once per flipped bit) and all round states are kept
+    if not isinstance(num_blocks, int) or not 1 <= num_blocks <= 256:
+        return jsonify({'error': 'num_blocks must be an integer between 1 and 256'}), 400
+
+    key_bytes = secrets.token_bytes(32)
+
+    try:
+        results = get_analysis('avalanche').run(key_bytes, num_blocks, seed)
+        return jsonify({'status': 'success', 'results': results})
+    except AnalysisUnavailable as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/key_avalanche', methods=['POST', 'OPTIONS'])
+def key_avalanche_test():
+    if request.method == 'OPTIONS':
+        return jsonify({"message": "CORS preflight successful"}), 200
+
+    data = request.get_json(silent=True) or {}
+    num_blocks = data.get('num_blocks', 16)
+    seed = data.get('seed')
+
+    if not isinstance(num_blocks, int) or not 1 <= num_blocks <= 256:
+        return jsonify({'error': 'num_blocks must be an integer between 1 and 256'}), 400
+
+    key_bytes = secrets.token_bytes(32)
+
+    try:
+        results = get_analysis('key_avalanche').run(key_bytes, num_blocks, seed)
+        return jsonify({'status': 'success', 'results': results})
+    except AnalysisUnavailable as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/sbox_profile', methods=['POST', 'OPTIONS'])
+def sbox_profile_test():
+    if request.method == 'OPTIONS':
+        return jsonify({"message": "CORS preflight successful"}), 200
+
+    data = request.get_json(silent=True) or {}
+    include_tables = bool(data.get('include_tables', False))
+
+    try:
+        if 'sbox' in data:
+            sbox = data['sbox']
+        elif 'key' in data:
+            sbox, _ = generate_key_dependent_sbox(bytes.fromhex(data['key']))
+        else:
+            sbox, _ = generate_key_dependent_sbox(secrets.token_bytes(32))
+        results = get_analysis('sbox_profile').run(sbox, include_tables)
+        return jsonify({'status': 'success', 'results': results})
+    except AnalysisUnavailable as e:
+        return jsonify({'error': str(e)}), 503
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        print("Error during advanced testing:", str(e))  # Debug print
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/decrypt', methods=['POST'])
 def api_decrypt():
     data = request.get_json()
     encrypted_text_base64 = data.get('encrypted_text')
-    key_hex = data.get('key')
     bitshift_matrices = data.get('bitshift_matrices')
+    backend = data.get('backend')
 
-    decrypted_text = decrypt(encrypted_text_base64, key_hex, bitshift_matrices)
+    try:
+        if 'key_id' in data:
+            decrypted_text = decrypt_with_context(encrypted_text_base64, key_store.get_context(data['key_id']),
+                                                  bitshift_matrices, backend)
+        else:
+            # Clients that still send the hex key
+            decrypted_text = decrypt(encrypted_text_base64, data.get('key'), bitshift_matrices, backend)
+    except UnknownKey:
+        return jsonify({'error': 'Unknown key_id'}), 404
+    except UnknownBackend:
+        return jsonify({'error': 'Unknown backend'}), 400
+    except BackendUnavailable as e:
+        return jsonify({'error': str(e)}), 503
 
     return jsonify({'decrypted_text': decrypted_text})
 
+@app.route('/api/keys', methods=['POST'])
+def create_key():
+    """
+    Adds a new random key, screened like the default key, to the keyring and returns its id.
+    """
+    try:
+        return jsonify({'key_id': key_store.add_key(generate_key())}), 201
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 500
+
 def brute_force_worker(encrypted_text, correct_key, max_attempts, thread_id, result_queue, shared_state):
     """
     Worker function to attempt decryption with random keys.
@@ -248,7 +439,6 @@ def brute_force_stream():
 
     # Generate a mock correct key for this session
     correct_key = secrets.token_bytes(32)
-    print(f"[DEBUG] Correct Key (hex): {correct_key.hex()}")  # Debugging purposes
 
     def generate():
         # Create new shared state for this request
@@ -310,233 +500,131 @@ def brute_force_stream():
     return Response(generate(), content_type="text/event-stream")
 
 
-def timing_analysis(input_text, key_bytes):
-    """
-    Measures execution time of the encryption process in microseconds.
-    """
-    num_attempts = 100
-    timings = []
-
-    for _ in range(num_attempts):
-        start_time = time.perf_counter()
-        encrypt(input_text, key_bytes)
-        end_time = time.perf_counter()
-        timings.append((end_time - start_time) * 1e6)  # Convert to microseconds
-
-    return timings
-
-
-def cache_timing_analysis(input_text, key_bytes):
-    """
-    Measures the execution time with induced cache misses.
-    """
-    num_attempts = 100
-    timings = []
-    large_data = bytearray(20 * 1024 * 1024)  # 20 MB data to exceed typical CPU cache size
-
-    for _ in range(num_attempts):
-        # Access the large data to flush the cache
-        for i in range(0, len(large_data), 4096):
-            large_data[i] = (large_data[i] + 1) % 256
-
-        start_time = time.perf_counter()
-        encrypt(input_text, key_bytes)
-        end_time = time.perf_counter()
-        timings.append((end_time - start_time) * 1e6)  # Microseconds
+@app.route('/api/cpa', methods=['POST', 'OPTIONS'])
+def cpa_test():
+    if request.method == 'OPTIONS':
+        return jsonify({"message": "CORS preflight successful"}), 200
 
-    return timings
+    data = request.get_json(silent=True) or {}
+    num_traces = data.get('num_traces', 100000)
+    leakage_model = data.get('leakage_model', 'hw')
+    noise_std = data.get('noise_std', 1.0)
+    seed = data.get('seed')
 
+    if not isinstance(num_traces, int) or not 10 <= num_traces <= 2_000_000:
+        return jsonify({'error': 'num_traces must be an integer between 10 and 2000000'}), 400
+    if not isinstance(noise_std, (int, float)) or noise_std < 0:
+        return jsonify({'error': 'noise_std must be a non-negative number'}), 400
 
-import requests
-import json
+    key_bytes = secrets.token_bytes(32)
 
-def get_cpu_temperature():
-    """
-    Fetches CPU temperature using OpenHardwareMonitor's web server.
-    """
     try:
-        # Replace with your actual OpenHardwareMonitor web server URL
-        url = "http://localhost:8085/data.json"
-        response = requests.get(url)
-        if response.status_code != 200:
-            raise Exception(f"Failed to fetch data: HTTP {response.status_code}")
-
-        data = response.json()
-
-        cpu_temperatures = []
-
-        # Recursive function to traverse the JSON tree
-        def traverse(node):
-            if 'Text' in node and 'Children' in node:
-                if 'Intel Core' in node['Text']:
-                    for child in node['Children']:
-                        if child['Text'] == 'Temperatures':
-                            for temp_sensor in child['Children']:
-                                # Get the temperature value, stripping '°C' and converting to float
-                                temp_value_str = temp_sensor.get('Value', '').replace('°C', '').strip()
-                                if temp_value_str:
-                                    temp_value = float(temp_value_str)
-                                    cpu_temperatures.append(temp_value)
-                else:
-                    for child in node['Children']:
-                        traverse(child)
-
-        # Start traversing from the root
-        for hardware in data.get('Children', []):
-            traverse(hardware)
-
-        if cpu_temperatures:
-            # Return the average CPU temperature
-            return sum(cpu_temperatures) / len(cpu_temperatures)
-        else:
-            return None
-
+        results = get_analysis('cpa').run(key_bytes, num_traces, leakage_model, noise_std=noise_std, seed=seed)
+        return jsonify({'status': 'success', 'results': results})
+    except AnalysisUnavailable as e:
+        return jsonify({'error': str(e)}), 503
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        print(f"Error reading temperature: {e}")
-        return None
-
+        return jsonify({'error': str(e)}), 500
 
 
-def generate_random_string(length):
+@app.route('/api/analyses', methods=['GET'])
+def analyses():
     """
-    Generates a random string of a specified length.
+    Lists the registered analyses and whether they can run on this host.
     """
-    return ''.join(random.choice(string.ascii_letters + string.digits) for _ in range(length))
-
-def get_stabilized_temperature(readings=5, delay=0.2):
-    """
-    Collects multiple temperature readings and averages them for stability.
-    """
-    temps = []
-    for _ in range(readings):
-        temp = get_cpu_temperature()
-        if temp is not None:
-            temps.append(temp)
-        time.sleep(delay)  # Delay between readings
-    return sum(temps) / len(temps) if temps else None
+    return jsonify({'analyses': [plugin.describe() for plugin in list_analyses()]})
 
 
-def power_consumption_analysis(num_strings, key_bytes):
+@app.route('/api/cache_stats', methods=['GET'])
+def cache_statistics():
     """
-    Measures temperature change during encryption as a proxy for power consumption.
-    Encrypts a specified number of randomly generated strings.
+    Size, hits, misses and evictions of the result cache and the block memo.
     """
-    temperature_changes = []
-
-    for _ in range(num_strings):
-        # Generate a random string for encryption
-        input_text = generate_random_string(10)
-
-        # Get stabilized initial CPU temperature
-        temp_before = get_stabilized_temperature()
-        if temp_before is None:
-            raise Exception("Could not read CPU temperature. Ensure OpenHardwareMonitor is running and the web server is enabled.")
+    return jsonify({'caches': cache_stats()})
 
-        # Perform encryption
-        encrypt(input_text, key_bytes)
 
-        # Get stabilized temperature after encryption
-        temp_after = get_stabilized_temperature()
-        if temp_after is None:
-            raise Exception("Could not read CPU temperature after encryption.")
-
-        # Calculate and normalize temperature change
-        temp_change = round(temp_after - temp_before, 2)  # Round to 2 decimals
-        temperature_changes.append(temp_change)
-
-    return temperature_changes
-
-def memory_access_pattern_analysis(input_text, key_bytes):
+@app.route('/api/backends', methods=['GET'])
+def backends():
     """
-    Measures memory allocation patterns during encryption.
+    Lists the cipher backends, their self-check results and the autotune table.
     """
-    num_attempts = 10  # Number of attempts to observe access patterns
-    memory_patterns = []
-
-    for _ in range(num_attempts):
-        tracemalloc.start()  # Start tracing memory allocations
-
-        # Perform encryption
-        encrypt(input_text, key_bytes)
-
-        # Take a snapshot of memory usage
-        snapshot = tracemalloc.take_snapshot()
-        tracemalloc.stop()  # Stop tracing
-
-        # Analyze memory usage
-        memory_stats = []
-        for stat in snapshot.statistics('lineno'):
-            memory_stats.append({
-                'line': stat.traceback.format()[-1],  # Line of code
-                'size': stat.size / 1024,  # Memory size in KB
-                'count': stat.count,  # Number of allocations
-            })
+    return jsonify(backend_report())
 
-        memory_patterns.append(memory_stats)
 
-    return memory_patterns
-
-
-def hamming_weight_analysis(input_text, key_bytes):
+@app.route('/api/admin/profile', methods=['POST'])
+def profile():
     """
-    Calculates the Hamming weight of the encrypted data.
+    Profiles a workload (encrypt, decrypt, rounds or advanced_test_encryption) on this instance.
+    Only enabled when ADMIN_TOKEN is set, and the X-Admin-Token header must match it.
+    Profiles run one at a time and at most once every PROFILE_MIN_INTERVAL seconds.
+    With format 'collapsed' the collapsed stacks are returned as plain text.
     """
-    num_attempts = 100
-    hamming_weights = []
+    admin_token = os.environ.get('ADMIN_TOKEN')
+    if not admin_token:
+        return jsonify({'error': 'Profiling is disabled'}), 404
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), admin_token):
+        return jsonify({'error': 'Invalid admin token'}), 403
+
+    from profiling import profile_workload, ProfilerBusy
+
+    data = request.get_json(silent=True) or {}
+    payload_size = data.get('payload_size', 4096)
+    repetitions = data.get('repetitions', 10)
+    top = data.get('top', 20)
+    interval = data.get('interval', 0.001)
+
+    if not isinstance(payload_size, int) or not 1 <= payload_size <= 1_000_000:
+        return jsonify({'error': 'payload_size must be an integer between 1 and 1000000'}), 400
+    if not isinstance(repetitions, int) or not 1 <= repetitions <= 1000:
+        return jsonify({'error': 'repetitions must be an integer between 1 and 1000'}), 400
+    if not isinstance(top, int) or not 1 <= top <= 200:
+        return jsonify({'error': 'top must be an integer between 1 and 200'}), 400
+    if not isinstance(interval, (int, float)) or not 0.0001 <= interval <= 1:
+        return jsonify({'error': 'interval must be a number between 0.0001 and 1'}), 400
 
-    for _ in range(num_attempts):
-        # Unpack the tuple returned by encrypt
-        encrypted_text_base64, _, _ = encrypt(input_text, key_bytes)
-        # Decode the base64 encoded encrypted text
-        encrypted_bytes = base64.b64decode(encrypted_text_base64.encode('ascii'))
-        # Calculate Hamming weight
-        hamming_weight = sum(bin(byte).count('1') for byte in encrypted_bytes)
-        hamming_weights.append(hamming_weight)
-
-    return hamming_weights
+    try:
+        result = profile_workload(data.get('workload', 'encrypt'), key_store.get_key(default_key_id), payload_size,
+                                  repetitions, data.get('mode', 'cprofile'), top, interval)
+    except ProfilerBusy as e:
+        return jsonify({'error': str(e)}), 429
+    except AnalysisUnavailable as e:
+        return jsonify({'error': str(e)}), 503
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
+    if data.get('format') == 'collapsed':
+        return Response(result['collapsed'] + '\n', content_type='text/plain')
+    return jsonify({'status': 'success', 'results': result})
 
 
 # API Endpoint
 @app.route('/api/side_channel_test', methods=['POST'])
 def side_channel_test():
-    data = request.get_json()
-    input_text = data.get('input_text', '')  # Default input_text for non-power tests
+    data = request.get_json(silent=True) or {}
     test_type = data.get('test_type', 'timing')
-    num_strings = data.get('num_strings', 1)  # Default to 1 string for power analysis
 
     key_bytes = bytes(secrets.token_bytes(32))
 
     try:
-        results = {}
-        if test_type == 'timing':
-            analysis_results = timing_analysis(input_text, key_bytes)
-            results[test_type] = analysis_results
-        elif test_type == 'cache':
-            analysis_results = cache_timing_analysis(input_text, key_bytes)
-            results[test_type] = analysis_results
-        elif test_type == 'power':
-            if not isinstance(num_strings, int) or num_strings < 1:
-                return jsonify({'error': 'Invalid number of strings for power analysis'}), 400
-            analysis_results = power_consumption_analysis(num_strings, key_bytes)
-            results[test_type] = analysis_results
-        elif test_type == 'memory':
-            analysis_results = memory_access_pattern_analysis(input_text, key_bytes)
-            results[test_type] = analysis_results
-        elif test_type == 'hamming':
-            analysis_results = hamming_weight_analysis(input_text, key_bytes)
-            results[test_type] = analysis_results
-        elif test_type == 'all':
-            # Run all tests
-            results['timing'] = timing_analysis(input_text, key_bytes)
-            results['cache'] = cache_timing_analysis(input_text, key_bytes)
-            results['power'] = power_consumption_analysis(num_strings, key_bytes)
-            results['memory'] = memory_access_pattern_analysis(input_text, key_bytes)
-            results['hamming'] = hamming_weight_analysis(input_text, key_bytes)
+        if test_type == 'all':
+            # Run every side-channel analysis available on this host
+            names = [plugin.name for plugin in list_analyses('side_channel') if plugin.available()]
         else:
-            return jsonify({'error': 'Invalid test type provided'}), 400
+            names = [test_type]
+
+        results = {}
+        for name in names:
+            results[name] = run_side_channel_analysis(name, data, key_bytes)
 
         return jsonify({'status': 'success', 'results': results})
+    except UnknownAnalysis:
+        return jsonify({'error': 'Invalid test type provided'}), 400
+    except AnalysisUnavailable as e:
+        return jsonify({'error': str(e)}), 503
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -0,0 +1,243 @@
+import importlib
+import importlib.util
+import os
+import random
+import threading
+import time
+
+
+class UnknownBackend(KeyError):
+    pass
+
+
+class BackendUnavailable(RuntimeError):
+    pass
+
+
+# Payload sizes (in blocks) timed by autotune; larger payloads use the backend of the largest size
+AUTOTUNE_SIZES = (1, 4, 16, 64)
+
+SELF_CHECK_BLOCKS = 32
+
+
+class CipherBackend:
+    """
+    A block cipher implementation provided by a module with the functions
+    encrypt_bytes(data, context) and decrypt_bytes(data, bitshift_bits, context).
+
+    data is a whole number of 16-byte blocks in text order and bitshift_bits holds the two low
+    bits of every plaintext byte, also in text order. Like analyses, the module is only imported
+    on first use and a backend is unavailable while a module in requires is missing.
+    A backend is only used once self_check found it bit-for-bit equal to the reference.
+    """
+
+    def __init__(self, name, module, description, requires=()):
+        self.name = name
+        self.module = module
+        self.description = description
+        self.requires = tuple(requires)
+        self.verified = None
+        self._implementation = None
+        self._lock = threading.Lock()
+
+    def missing(self):
+        return [module for module in self.requires if importlib.util.find_spec(module) is None]
+
+    def available(self):
+        return not self.missing()
+
+    def load(self):
+        if self._implementation is None:
+            with self._lock:
+                if self._implementation is None:
+                    missing = self.missing()
+                    if missing:
+                        raise BackendUnavailable(f"Backend '{self.name}' requires {', '.join(missing)}")
+                    self._implementation = importlib.import_module(self.module)
+        return self._implementation
+
+    def encrypt_bytes(self, data, context):
+        return self.load().encrypt_bytes(data, context)
+
+    def decrypt_bytes(self, data, bitshift_bits, context):
+        return self.load().decrypt_bytes(data, bitshift_bits, context)
+
+    def describe(self):
+        return {
+            'name': self.name,
+            'description': self.description,
+            'requires': list(self.requires),
+            'available': self.available(),
+            'verified': self.verified,
+        }
+
+
+REFERENCE = 'reference'
+
+_registry = {}
+_tuning = []
+_tuning_lock = threading.Lock()
+# Held for a whole autotune run, so concurrent first requests wait for one run instead of each tuning
+_autotune_lock = threading.Lock()
+
+
+def register_backend(backend):
+    _registry[backend.name] = backend
+    return backend
+
+
+def get_backend(name):
+    try:
+        return _registry[name]
+    except KeyError:
+        raise UnknownBackend(name) from None
+
+
+def list_backends():
+    return list(_registry.values())
+
+
+def self_check(backend, num_blocks=SELF_CHECK_BLOCKS):
+    """
+    Compare encryption and decryption of random blocks under a random key with the reference
+    backend. The inputs are seeded, so every process checks the same vectors. The result is
+    remembered in backend.verified.
+    """
+    if backend.verified is None:
+        from encryption import get_key_context
+
+        rng = random.Random(0)
+        context = get_key_context(bytes(rng.getrandbits(8) for _ in range(32)))
+        data = bytes(rng.getrandbits(8) for _ in range(16 * num_blocks))
+        bitshift_bits = bytes(byte & 0b11 for byte in data)
+        reference = get_backend(REFERENCE)
+        try:
+            ciphertext = backend.encrypt_bytes(data, context)
+            backend.verified = (
+                ciphertext == reference.encrypt_bytes(data, context)
+                and backend.decrypt_bytes(ciphertext, bitshift_bits, context) == data
+            )
+        except BackendUnavailable:
+            return False
+        except Exception:
+            backend.verified = False
+    return backend.verified
+
+
+def _usable_backends():
+    return [backend for backend in list_backends() if backend.available() and self_check(backend)]
+
+
+def autotune(sizes=AUTOTUNE_SIZES, repeats=3):
+    """
+    Time every usable backend on payloads of each size and remember the fastest one per size.
+    Returns the table as a list of (size in blocks, backend name, seconds per block).
+    """
+    from encryption import get_key_context
+
+    context = get_key_context(bytes(32))
+    backends = _usable_backends()
+    table = []
+    for size in sizes:
+        data = os.urandom(16 * size)
+        best = None
+        for backend in backends:
+            backend.encrypt_bytes(data, context)  # Warm up
+            elapsed = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                backend.encrypt_bytes(data, context)
+                elapsed.append(time.perf_counter() - start)
+            per_block = min(elapsed) / size
+            if best is None or per_block < best[2]:
+                best = (size, backend.name, per_block)
+        table.append(best)
+
+    with _tuning_lock:
+        _tuning[:] = table
+    return table
+
+
+def ensure_tuned():
+    """The autotune table, running autotune once if no run has finished yet."""
+    with _tuning_lock:
+        table = list(_tuning)
+    if table:
+        return table
+    with _autotune_lock:
+        with _tuning_lock:
+            table = list(_tuning)
+        return table or autotune()
+
+
+def select_backend(num_blocks, name=None):
+    """
+    The backend to use for a payload of num_blocks blocks. name, or the CIPHER_BACKEND
+    environment variable, forces a backend; otherwise ('auto') the autotune table decides,
+    running autotune on first use.
+    """
+    name = name or os.environ.get('CIPHER_BACKEND', 'auto')
+    if name != 'auto':
+        backend = get_backend(name)
+        backend.load()
+        if not self_check(backend):
+            raise BackendUnavailable(f"Backend '{name}' failed its self-check")
+        return backend
+
+    table = ensure_tuned()
+    choice = table[0][1]
+    for size, backend_name, _ in table:
+        if size <= num_blocks:
+            choice = backend_name
+    return get_backend(choice)
+
+
+def start_backends():
+    """
+    Startup check of the CIPHER_BACKEND setting. A forced backend must exist and pass its
+    self-check, otherwise ValueError is raised; in 'auto' mode autotune starts in a background
+    thread, and requests arriving before it finishes wait for that run.
+    """
+    name = os.environ.get('CIPHER_BACKEND', 'auto')
+    if name == 'auto':
+        threading.Thread(target=ensure_tuned, name='autotune', daemon=True).start()
+        return
+    try:
+        select_backend(1, name)
+    except UnknownBackend:
+        raise ValueError(f"CIPHER_BACKEND must be 'auto' or one of {', '.join(_registry)}, not '{name}'") from None
+    except BackendUnavailable as e:
+        raise ValueError(f"CIPHER_BACKEND: {e}") from None
+
+
+def backend_report():
+    with _tuning_lock:
+        table = list(_tuning)
+    return {
+        'backends': [backend.describe() for backend in list_backends()],
+        'override': os.environ.get('CIPHER_BACKEND', 'auto'),
+        'autotune': [
+            {'blocks': size, 'backend': name, 'microseconds_per_block': seconds * 1e6}
+            for size, name, seconds in table
+        ],
+    }
+
+
+register_backend(CipherBackend(
+    REFERENCE, 'Cypher',
+    'Pure-Python implementation working on one 4x4 block at a time',
+))
+register_backend(CipherBackend(
+    'numpy', 'batch_engine',
+    'NumPy engine processing all blocks of a payload together',
+    requires=('numpy',),
+))
+register_backend(CipherBackend(
+    'bitsliced', 'bitsliced',
+    'Bitsliced engine: 128 bit planes, S-Box as a Boolean circuit, no data-dependent table lookups',
+    requires=('numpy',),
+))
+register_backend(CipherBackend(
+    'flat', 'state',
+    'Pure-Python engine mutating one flat 16-byte state in place',
+))
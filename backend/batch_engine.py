@@ -0,0 +1,201 @@
+import hashlib
+
+import numpy as np
+
+from key_schedule import RCON, STANDARD_S_BOX
+from matrix_operations import galois_mult
+
+STANDARD_S_BOX_ARRAY = np.array(STANDARD_S_BOX, dtype=np.uint8)
+
+# GF(2^8) multiplication tables used by MixColumns
+MUL2 = np.array([galois_mult(x, 2) for x in range(256)], dtype=np.uint8)
+MUL3 = np.array([galois_mult(x, 3) for x in range(256)], dtype=np.uint8)
+
+# and by InvMixColumns
+MUL9 = np.array([galois_mult(x, 9) for x in range(256)], dtype=np.uint8)
+MUL11 = np.array([galois_mult(x, 11) for x in range(256)], dtype=np.uint8)
+MUL13 = np.array([galois_mult(x, 13) for x in range(256)], dtype=np.uint8)
+MUL14 = np.array([galois_mult(x, 14) for x in range(256)], dtype=np.uint8)
+
+# Number of set bits of every byte value
+POPCOUNT = np.array([bin(x).count('1') for x in range(256)], dtype=np.uint8)
+
+# ShiftRows as a gather: new[row][col] = old[row][(col + row) % 4]
+_ROWS = np.arange(4)[:, None]
+_SHIFT_ROWS_COLS = (np.arange(4)[None, :] + np.arange(4)[:, None]) % 4
+_INVERSE_SHIFT_ROWS_COLS = (np.arange(4)[None, :] - np.arange(4)[:, None]) % 4
+
+
+def context_arrays(context):
+    """Convert a KeyContext into the round key (15, 4, 4) and S-Box (256,) arrays used by the engine."""
+    round_keys = np.array(context.round_keys, dtype=np.uint8)
+    sbox = np.array(context.sbox, dtype=np.uint8)
+    return round_keys, sbox
+
+
+def key_expansion_batch(keys):
+    """
+    AES-256 key expansion of K keys at once.
+    keys is a (K, 32) uint8 array; returns the (K, 15, 4, 4) round keys, matching key_expansion.
+    """
+    keys = np.asarray(keys, dtype=np.uint8)
+    words = np.zeros((keys.shape[0], 60, 4), dtype=np.uint8)
+    words[:, :8] = keys.reshape(-1, 8, 4)
+
+    for i in range(8, 60):
+        temp = words[:, i - 1]
+        if i % 8 == 0:
+            temp = STANDARD_S_BOX_ARRAY[np.roll(temp, -1, axis=1)]
+            temp[:, 0] ^= RCON[i // 8]
+        elif i % 8 == 4:
+            temp = STANDARD_S_BOX_ARRAY[temp]
+        words[:, i] = words[:, i - 8] ^ temp
+
+    # Round key r holds words 4r..4r+3 as its columns
+    return words.reshape(-1, 15, 4, 4).transpose(0, 1, 3, 2).copy()
+
+
+def generate_key_dependent_sboxes(keys):
+    """
+    Key-dependent S-Boxes of K keys at once, matching generate_key_dependent_sbox.
+    keys is a (K, 32) uint8 array; returns the (K, 256) S-Boxes and inverse S-Boxes.
+    """
+    keys = np.asarray(keys, dtype=np.uint8)
+    digests = np.array([list(hashlib.sha256(key.tobytes()).digest()) for key in keys], dtype=np.int64)
+    sboxes = np.tile(np.arange(256, dtype=np.int64), (keys.shape[0], 1))
+    rows = np.arange(keys.shape[0])
+
+    j = np.zeros(keys.shape[0], dtype=np.int64)
+    for i in range(256):
+        j = (j + sboxes[:, i] + digests[:, i % 32]) % 256
+        swapped = sboxes[rows, j]
+        sboxes[rows, j] = sboxes[:, i]
+        sboxes[:, i] = swapped
+
+    inverse_sboxes = np.empty_like(sboxes)
+    inverse_sboxes[rows[:, None], sboxes] = np.arange(256)
+    return sboxes.astype(np.uint8), inverse_sboxes.astype(np.uint8)
+
+
+def text_to_blocks(padded_text):
+    """Convert padded text into an (N, 16) array of blocks."""
+    return np.frombuffer(padded_text.encode('latin1'), dtype=np.uint8).reshape(-1, 16)
+
+
+def _sub_bytes(state, sbox, key_index):
+    if key_index is None:
+        return sbox[state]
+    return sbox[key_index[:, None, None], state]
+
+
+def _add_round_key(state, round_keys, round, key_index):
+    if key_index is None:
+        return state ^ round_keys[round]
+    return state ^ round_keys[key_index, round]
+
+
+def _mix_columns(state):
+    a0, a1, a2, a3 = state[:, 0], state[:, 1], state[:, 2], state[:, 3]
+    return np.stack([
+        MUL2[a0] ^ MUL3[a1] ^ a2 ^ a3,
+        a0 ^ MUL2[a1] ^ MUL3[a2] ^ a3,
+        a0 ^ a1 ^ MUL2[a2] ^ MUL3[a3],
+        MUL3[a0] ^ a1 ^ a2 ^ MUL2[a3],
+    ], axis=1)
+
+
+def _inverse_mix_columns(state):
+    a0, a1, a2, a3 = state[:, 0], state[:, 1], state[:, 2], state[:, 3]
+    return np.stack([
+        MUL14[a0] ^ MUL11[a1] ^ MUL13[a2] ^ MUL9[a3],
+        MUL9[a0] ^ MUL14[a1] ^ MUL11[a2] ^ MUL13[a3],
+        MUL13[a0] ^ MUL9[a1] ^ MUL14[a2] ^ MUL11[a3],
+        MUL11[a0] ^ MUL13[a1] ^ MUL9[a2] ^ MUL14[a3],
+    ], axis=1)
+
+
+def initial_state(blocks, round_keys, key_index=None):
+    """
+    (N, 4, 4) state entering round 1: bitshift layer, transpose and initial AddRoundKey.
+    Arguments are as for encrypt_blocks.
+    """
+    # Bitshift layer followed by the transpose leaves state[row][col] = block[row * 4 + col] >> 2
+    state = np.asarray(blocks, dtype=np.uint8).reshape(-1, 4, 4) >> 2
+    return _add_round_key(state, round_keys, 0, key_index)
+
+
+def encrypt_blocks(blocks, round_keys, sbox, key_index=None, return_rounds=False):
+    """
+    Encrypt many blocks at once, producing the same output as encrypt_block for each of them.
+
+    blocks are an (N, 16) uint8 array in text order. With a single key, round_keys is a
+    (15, 4, 4) array and sbox a (256,) array. To encrypt under several keys in one pass,
+    pass (K, 15, 4, 4) round keys, (K, 256) S-Boxes and key_index, the key of each block.
+
+    Returns the (N, 16) ciphertext blocks, the (N, 4, 4) bitshift bits matrices and, if
+    return_rounds is set, the (N, 15, 16) state after each round in row-major order
+    (the order used for 'text_state' in the round details), otherwise None.
+    """
+    blocks = np.asarray(blocks, dtype=np.uint8)
+
+    # Column-major blocks: matrix[row][col] = block[col * 4 + row]
+    bitshift_bits = (blocks & 0b11).reshape(-1, 4, 4).transpose(0, 2, 1)
+
+    state = initial_state(blocks, round_keys, key_index)
+
+    rounds = None
+    if return_rounds:
+        rounds = np.empty((state.shape[0], 15, 16), dtype=np.uint8)
+        rounds[:, 0] = state.reshape(-1, 16)
+
+    for round in range(1, 15):
+        state = _sub_bytes(state, sbox, key_index)
+        state = state[:, _ROWS, _SHIFT_ROWS_COLS]
+        if round < 14:
+            state = _mix_columns(state)
+        state = _add_round_key(state, round_keys, round, key_index)
+        if return_rounds:
+            rounds[:, round] = state.reshape(-1, 16)
+
+    ciphertext = state.transpose(0, 2, 1).reshape(-1, 16)
+    return ciphertext, bitshift_bits, rounds
+
+
+def decrypt_blocks(ciphertext, bitshift_bits, round_keys, inverse_sbox, key_index=None):
+    """
+    Decrypt many blocks at once, producing the same output as decrypt_block for each of them.
+
+    ciphertext and bitshift_bits are (N, 16) uint8 arrays in text order; the other arguments
+    are as for encrypt_blocks, with the inverse S-Boxes in place of the S-Boxes.
+    Returns the (N, 16) plaintext blocks.
+    """
+    # Column-major blocks: state[row][col] = block[col * 4 + row]
+    state = np.asarray(ciphertext, dtype=np.uint8).reshape(-1, 4, 4).transpose(0, 2, 1)
+    state = _add_round_key(state, round_keys, 14, key_index)
+
+    for round in range(13, -1, -1):
+        state = state[:, _ROWS, _INVERSE_SHIFT_ROWS_COLS]
+        state = _sub_bytes(state, inverse_sbox, key_index)
+        state = _add_round_key(state, round_keys, round, key_index)
+        if round > 0:
+            state = _inverse_mix_columns(state)
+
+    # The transpose and the inverse bitshift layer leave block[col * 4 + row] = state[col][row] << 2 | bits
+    bitshift_bits = np.asarray(bitshift_bits, dtype=np.uint8).reshape(-1, 16)
+    return (state.reshape(-1, 16) << 2) | bitshift_bits
+
+
+def encrypt_bytes(data, context):
+    """Cipher backend entry point: encrypt padded bytes with a KeyContext, returning the ciphertext bytes."""
+    round_keys, sbox = context_arrays(context)
+    ciphertext, _, _ = encrypt_blocks(np.frombuffer(data, dtype=np.uint8).reshape(-1, 16), round_keys, sbox)
+    return ciphertext.tobytes()
+
+
+def decrypt_bytes(data, bitshift_bits, context):
+    """Cipher backend entry point: decrypt ciphertext bytes given their bitshift bits in text order."""
+    round_keys, _ = context_arrays(context)
+    inverse_sbox = np.array(context.inverse_sbox, dtype=np.uint8)
+    plaintext = decrypt_blocks(np.frombuffer(data, dtype=np.uint8).reshape(-1, 16),
+                               np.frombuffer(bitshift_bits, dtype=np.uint8), round_keys, inverse_sbox)
+    return plaintext.tobytes()
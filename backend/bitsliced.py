@@ -0,0 +1,172 @@
+from functools import lru_cache, reduce
+from operator import xor
+
+import numpy as np
+
+# State planes are indexed [position][bit], position = row * 4 + col of the state matrix.
+# Every plane is a Python int holding that bit of that state byte for all blocks, block i in bit i.
+
+# ShiftRows as a gather: new[row][col] = old[row][(col + row) % 4]
+SHIFT_ROWS = [row * 4 + (col + row) % 4 for row in range(4) for col in range(4)]
+INVERSE_SHIFT_ROWS = [row * 4 + (col - row) % 4 for row in range(4) for col in range(4)]
+
+# Text order <-> state position: ciphertext byte col * 4 + row is state[row][col]
+COLUMN_MAJOR = [col * 4 + row for row in range(4) for col in range(4)]
+
+
+def _to_planes(blocks):
+    """(N, 16) uint8 blocks -> 16 x 8 planes."""
+    bits = np.unpackbits(blocks[:, :, None], axis=2, bitorder='little')
+    packed = np.packbits(bits.transpose(1, 2, 0), axis=2, bitorder='little')
+    return [[int.from_bytes(packed[position, bit].tobytes(), 'little') for bit in range(8)]
+            for position in range(16)]
+
+
+def _from_planes(planes, num_blocks):
+    """16 x 8 planes -> (N, 16) uint8 blocks."""
+    size = (num_blocks + 7) // 8
+    packed = np.frombuffer(
+        b''.join(plane.to_bytes(size, 'little') for byte in planes for plane in byte), dtype=np.uint8
+    ).reshape(16, 8, size)
+    bits = np.unpackbits(packed, axis=2, count=num_blocks, bitorder='little')
+    return np.packbits(bits.transpose(2, 0, 1), axis=2, bitorder='little').reshape(num_blocks, 16)
+
+
+@lru_cache(maxsize=64)
+def sbox_anf(sbox):
+    """
+    Algebraic normal form of every output bit of an S-Box (given as bytes).
+    Output bit j is the XOR of the monomials in the j-th tuple, monomial m being the AND of
+    the input bits set in m (m = 0 is the constant 1). Computed with the Moebius transform.
+    """
+    anf = []
+    for bit in range(8):
+        table = [(value >> bit) & 1 for value in sbox]
+        for i in range(8):
+            step = 1 << i
+            for x in range(256):
+                if x & step:
+                    table[x] ^= table[x ^ step]
+        anf.append(tuple(monomial for monomial in range(256) if table[monomial]))
+    return tuple(anf)
+
+
+def _sub_byte(planes, anf, ones):
+    # All 256 monomials of the 8 input bits, built with one AND each
+    monomials = [ones] + [0] * 255
+    for bit in range(8):
+        step = 1 << bit
+        plane = planes[bit]
+        for low in range(step):
+            monomials[step | low] = monomials[low] & plane
+    return [reduce(xor, [monomials[monomial] for monomial in terms], 0) for terms in anf]
+
+
+def _sub_bytes(state, anf, ones):
+    return [_sub_byte(planes, anf, ones) for planes in state]
+
+
+def _add_round_key(state, round_key, ones):
+    # A key bit of 1 flips the plane of every block; multiplying avoids a branch on the key
+    return [[state[position][bit] ^ (ones * ((round_key[position // 4][position % 4] >> bit) & 1))
+             for bit in range(8)] for position in range(16)]
+
+
+def _xtime(a):
+    # Multiplication by 2 in GF(2^8): shift left and reduce by 0x1B (bits 0, 1, 3 and 4)
+    return [a[7], a[0] ^ a[7], a[1], a[2] ^ a[7], a[3] ^ a[7], a[4], a[5], a[6]]
+
+
+def _mix_columns(state):
+    mixed = [None] * 16
+    for col in range(4):
+        a0, a1, a2, a3 = (state[row * 4 + col] for row in range(4))
+        x0, x1, x2, x3 = _xtime(a0), _xtime(a1), _xtime(a2), _xtime(a3)
+        mixed[col] = [x0[b] ^ x1[b] ^ a1[b] ^ a2[b] ^ a3[b] for b in range(8)]
+        mixed[4 + col] = [a0[b] ^ x1[b] ^ x2[b] ^ a2[b] ^ a3[b] for b in range(8)]
+        mixed[8 + col] = [a0[b] ^ a1[b] ^ x2[b] ^ x3[b] ^ a3[b] for b in range(8)]
+        mixed[12 + col] = [x0[b] ^ a0[b] ^ a1[b] ^ a2[b] ^ x3[b] for b in range(8)]
+    return mixed
+
+
+def _inverse_mix_columns(state):
+    # InvMixColumns = MixColumns after adding 4 * (a0 ^ a2) to a0, a2 and 4 * (a1 ^ a3) to a1, a3
+    state = list(state)
+    for col in range(4):
+        a0, a1, a2, a3 = (state[row * 4 + col] for row in range(4))
+        u = _xtime(_xtime([a0[b] ^ a2[b] for b in range(8)]))
+        v = _xtime(_xtime([a1[b] ^ a3[b] for b in range(8)]))
+        state[col] = [a0[b] ^ u[b] for b in range(8)]
+        state[4 + col] = [a1[b] ^ v[b] for b in range(8)]
+        state[8 + col] = [a2[b] ^ u[b] for b in range(8)]
+        state[12 + col] = [a3[b] ^ v[b] for b in range(8)]
+    return _mix_columns(state)
+
+
+def encrypt_blocks(blocks, round_keys, sbox):
+    """
+    Encrypt (N, 16) uint8 blocks in text order, producing the same ciphertext as encrypt_block.
+
+    The blocks are transposed into 128 bit planes and all of them go through every round
+    together. SubBytes evaluates the key-dependent S-Box as a Boolean circuit derived from
+    its table, and ShiftRows, MixColumns and AddRoundKey are plane permutations and XORs, so
+    no memory access depends on the data. (Timing still depends on CPython big integers.)
+    """
+    num_blocks = blocks.shape[0]
+    ones = (1 << num_blocks) - 1
+    anf = sbox_anf(bytes(sbox))
+    planes = _to_planes(blocks)
+
+    # Bitshift layer and transpose: state[row][col] = block[row * 4 + col] >> 2
+    state = [planes[position][2:] + [0, 0] for position in range(16)]
+    state = _add_round_key(state, round_keys[0], ones)
+
+    for round in range(1, 15):
+        state = _sub_bytes(state, anf, ones)
+        state = [state[position] for position in SHIFT_ROWS]
+        if round < 14:
+            state = _mix_columns(state)
+        state = _add_round_key(state, round_keys[round], ones)
+
+    return _from_planes([state[position] for position in COLUMN_MAJOR], num_blocks)
+
+
+def decrypt_blocks(ciphertext, bitshift_bits, round_keys, inverse_sbox):
+    """Decrypt (N, 16) uint8 blocks given their (N, 16) bitshift bits, both in text order."""
+    num_blocks = ciphertext.shape[0]
+    ones = (1 << num_blocks) - 1
+    anf = sbox_anf(bytes(inverse_sbox))
+    planes = _to_planes(ciphertext)
+
+    state = [planes[position] for position in COLUMN_MAJOR]
+    state = _add_round_key(state, round_keys[14], ones)
+
+    for round in range(13, -1, -1):
+        state = [state[position] for position in INVERSE_SHIFT_ROWS]
+        state = _sub_bytes(state, anf, ones)
+        state = _add_round_key(state, round_keys[round], ones)
+        if round > 0:
+            state = _inverse_mix_columns(state)
+
+    # The transpose and the inverse bitshift layer leave block[i] = state[i] << 2 | bits
+    bits = _to_planes(bitshift_bits)
+    plaintext = [[bits[position][bit] | (state[position][bit - 2] if bit >= 2 else 0) for bit in range(8)]
+                 for position in range(16)]
+    return _from_planes(plaintext, num_blocks)
+
+
+def encrypt_bytes(data, context):
+    """Cipher backend entry point: encrypt padded bytes with a KeyContext, returning the ciphertext bytes."""
+    if not data:
+        return b''
+    blocks = np.frombuffer(data, dtype=np.uint8).reshape(-1, 16)
+    return encrypt_blocks(blocks, context.round_keys, context.sbox).tobytes()
+
+
+def decrypt_bytes(data, bitshift_bits, context):
+    """Cipher backend entry point: decrypt ciphertext bytes given their bitshift bits in text order."""
+    if not data:
+        return b''
+    ciphertext = np.frombuffer(data, dtype=np.uint8).reshape(-1, 16)
+    bits = np.frombuffer(bitshift_bits, dtype=np.uint8).reshape(-1, 16)
+    return decrypt_blocks(ciphertext, bits, context.round_keys, context.inverse_sbox).tobytes()
@@ -0,0 +1,131 @@
+import math
+import random
+import threading
+import time
+
+import numpy as np
+
+from Cypher import encrypt_block
+from encryption import get_key_context
+
+EVICTION_MODES = ('full', 'sbox', 'none')
+
+_buffers = {}
+_buffers_lock = threading.Lock()
+
+
+class EvictionBuffer:
+    """
+    Buffer touched between measurements to evict the CPU caches.
+
+    Full eviction writes one byte per cache line of the whole buffer, which should be larger
+    than the last-level cache. Targeted eviction only writes the buffer lines that map to the
+    same cache sets as a lookup table, set_span being the size of one cache way
+    (number of sets * line size) and ways the number of lines written per set.
+    """
+
+    def __init__(self, size_bytes=20 * 1024 * 1024, line_size=64, set_span=4096, ways=16):
+        self.buffer = np.zeros(size_bytes, dtype=np.uint8)
+        self.line_size = line_size
+        self.set_span = set_span
+        self.ways = ways
+
+    def evict(self):
+        self.buffer[::self.line_size] += 1
+
+    def targeted_offsets(self, addresses):
+        """Offsets of the buffer lines sharing a cache set with any of the given addresses."""
+        base = self.buffer.ctypes.data
+        sets = {(address % self.set_span) // self.line_size for address in addresses}
+        offsets = []
+        for cache_set in sorted(sets):
+            first = (cache_set * self.line_size - base) % self.set_span
+            offsets.extend(range(first, min(self.buffer.size, first + self.ways * self.set_span), self.set_span))
+        return np.array(offsets, dtype=np.intp)
+
+    def evict_targeted(self, offsets):
+        self.buffer[offsets] += 1
+
+
+def get_eviction_buffer(size_bytes=20 * 1024 * 1024, line_size=64, set_span=4096, ways=16):
+    """Return the shared eviction buffer for this configuration, allocating it on first use."""
+    config = (size_bytes, line_size, set_span, ways)
+    with _buffers_lock:
+        if config not in _buffers:
+            _buffers[config] = EvictionBuffer(*config)
+        return _buffers[config]
+
+
+def sbox_table_addresses(table, line_size=64):
+    """
+    Addresses of the cache lines holding a bytearray S-Box table. Lookups in a bytearray read
+    its own byte buffer, unlike a list, whose items are pointers to interpreter-wide int objects.
+    """
+    base = np.frombuffer(table, dtype=np.uint8).ctypes.data
+    return list(range(base - base % line_size, base + len(table), line_size))
+
+
+def cache_timing_profile(key_bytes, num_attempts=2000, eviction='full', byte_index=0,
+                         buffer_size=20 * 1024 * 1024, seed=None):
+    """
+    Time single block encryptions after evicting the caches, grouped by plaintext byte value.
+
+    eviction is 'full' (walk the whole eviction buffer), 'sbox' (only the cache sets of the
+    S-Box table) or 'none'. Each attempt encrypts a random block; timings are grouped by the
+    value of the plaintext byte at byte_index, so table-lookup leakage shows up as differences
+    between the per-value means. In every mode the blocks are encrypted with the S-Box held in a
+    bytearray, whose buffer is the memory the targeted eviction aims at.
+    """
+    if eviction not in EVICTION_MODES:
+        raise ValueError(f"eviction must be one of {', '.join(EVICTION_MODES)}")
+    if not 0 <= byte_index < 16:
+        raise ValueError("byte_index must be between 0 and 15")
+
+    context = get_key_context(bytes(key_bytes))
+    round_keys, sbox = context.round_keys, bytearray(context.sbox)
+    buffer = get_eviction_buffer(buffer_size)
+    offsets = buffer.targeted_offsets(sbox_table_addresses(sbox, buffer.line_size)) if eviction == 'sbox' else None
+    rng = random.Random(seed)
+
+    counts = [0] * 256
+    sums = [0.0] * 256
+    squares = [0.0] * 256
+    eviction_ns = 0
+
+    for _ in range(num_attempts):
+        block = [rng.randrange(256) for _ in range(16)]
+        matrix = [[block[col * 4 + row] for col in range(4)] for row in range(4)]
+
+        eviction_start = time.perf_counter_ns()
+        if eviction == 'full':
+            buffer.evict()
+        elif eviction == 'sbox':
+            buffer.evict_targeted(offsets)
+        start = time.perf_counter_ns()
+        encrypt_block(matrix, round_keys, sbox, trace=False)
+        elapsed = time.perf_counter_ns() - start
+        eviction_ns += start - eviction_start
+
+        value = block[byte_index]
+        counts[value] += 1
+        sums[value] += elapsed
+        squares[value] += elapsed * elapsed
+
+    total = sum(sums)
+    mean = total / num_attempts
+    std = math.sqrt(max(0.0, sum(squares) / num_attempts - mean * mean))
+    by_value = [{'value': value, 'count': counts[value], 'mean_ns': sums[value] / counts[value]}
+                for value in range(256) if counts[value]]
+    value_means = [entry['mean_ns'] for entry in by_value]
+
+    return {
+        'attempts': num_attempts,
+        'eviction': eviction,
+        'eviction_buffer_bytes': buffer.buffer.size,
+        'mean_eviction_ns': eviction_ns / num_attempts,
+        'mean_ns': mean,
+        'std_ns': std,
+        'byte_index': byte_index,
+        'by_byte_value': by_value,
+        'byte_value_spread_ns': max(value_means) - min(value_means),
+    }
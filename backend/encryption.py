@@ -1,11 +1,18 @@
 import secrets
+from collections import namedtuple
+from functools import lru_cache
 from utils import pad_text, unpad_text
 from matrix_operations import split_string_to_column_major_matrix, merge_matrices_to_text
 from Cypher import encrypt_block, decrypt_block
 from key_schedule import key_expansion
 from sbox import generate_key_dependent_sbox
 from utils import generate_key_matrix
+from backends import select_backend
+from state import flatten_round_keys
+from result_cache import get_cache, pack_json, unpack_json
 import base64
+import hashlib
+import struct
 
 
 def to_base64_and_latin1(matrix):
@@ -19,21 +26,86 @@ def to_base64_and_latin1(matrix):
     return base64_encoded
 
 
-def encrypt(text, key_bytes):
-    padded_text = pad_text(text)
-    matrices = split_string_to_column_major_matrix(padded_text)
-    key_matrix = generate_key_matrix(key_bytes)
+# round_keys are 4x4 matrices; flat_round_keys hold the same keys in the BlockState layout
+KeyContext = namedtuple('KeyContext', ['round_keys', 'sbox', 'inverse_sbox', 'flat_round_keys'])
+
+
+@lru_cache(maxsize=64)
+def get_key_context(key_bytes):
+    """
+    Expand the key and build the key-dependent S-Boxes once per key.
+    The returned round keys and S-Boxes are shared between callers and must not be modified.
+    """
+    key_matrix = generate_key_matrix(bytes(key_bytes))
     round_keys = key_expansion(key_matrix)
 
     # Generate key-dependent S-Box
-    sbox, inverse_sbox = generate_key_dependent_sbox(key_bytes)
+    sbox, inverse_sbox = generate_key_dependent_sbox(bytes(key_bytes))
+    return KeyContext(round_keys, sbox, inverse_sbox, flatten_round_keys(round_keys))
+
+
+def _bitshift_bits_matrices(data):
+    # Column-major blocks: matrix[row][col] = block[col * 4 + row]
+    return [[[data[start + col * 4 + row] & 0b11 for col in range(4)] for row in range(4)]
+            for start in range(0, len(data), 16)]
+
+
+def _key_fingerprint(context):
+    # Round keys 0 and 1 are the 256-bit key itself
+    return hashlib.sha256(b'%032x%032x' % context.flat_round_keys[:2]).digest()[:16]
+
+
+# Messages of up to this many blocks go through the block memo. Longer ones only when they repeat
+# blocks: looking up and storing every block costs more than encrypting unique data, and large
+# messages would evict the memo's entries for short repeated ones
+MEMO_MAX_BLOCKS = 64
+
+
+def _encrypt_bytes_memo(data, context, backend=None):
+    """
+    Encrypt padded bytes with the cipher backend, going through the block memo.
+    Every distinct block of the message is encrypted at most once, and not at all if the memo
+    already holds its ciphertext under the same key. Messages longer than MEMO_MAX_BLOCKS
+    without repeated blocks are encrypted directly.
+    """
+    memo = get_cache('blocks')
+    num_blocks = len(data) // 16
+    if not memo.enabled:
+        return select_backend(num_blocks, backend).encrypt_bytes(data, context)
+
+    blocks = [data[start:start + 16] for start in range(0, len(data), 16)]
+    unique_blocks = dict.fromkeys(blocks)
+    if num_blocks > MEMO_MAX_BLOCKS and len(unique_blocks) == num_blocks:
+        return select_backend(num_blocks, backend).encrypt_bytes(data, context)
+
+    fingerprint = _key_fingerprint(context)
+    ciphertexts = {}
+    missing = []
+    for block in unique_blocks:
+        ciphertext = memo.get(fingerprint + block)
+        if ciphertext is None:
+            missing.append(block)
+        else:
+            ciphertexts[block] = ciphertext
+
+    if missing:
+        encrypted = select_backend(len(missing), backend).encrypt_bytes(b''.join(missing), context)
+        for index, block in enumerate(missing):
+            ciphertexts[block] = encrypted[index * 16:index * 16 + 16]
+            memo.put(fingerprint + block, ciphertexts[block])
+
+    return b''.join(ciphertexts[block] for block in blocks)
+
+
+def _encrypt_matrices(matrices, context, trace, first_block=0):
+    round_keys, sbox = context.round_keys, context.sbox
 
     encrypted_matrices = []
     bitshift_bits_matrices = []
     all_round_details = []
 
-    for block_index, matrix in enumerate(matrices):
-        encrypted_matrix, bitshift_bits_matrix, round_details = encrypt_block(matrix, round_keys, sbox)
+    for block_index, matrix in enumerate(matrices, first_block):
+        encrypted_matrix, bitshift_bits_matrix, round_details = encrypt_block(matrix, round_keys, sbox, trace)
 
         # Add block information to each round
         for round_detail in round_details:
@@ -43,26 +115,61 @@ def encrypt(text, key_bytes):
         bitshift_bits_matrices.append(bitshift_bits_matrix)
         all_round_details.extend(round_details)  # Collect all rounds from each block
 
+    return encrypted_matrices, bitshift_bits_matrices, all_round_details
+
+
+def encrypt(text, key_bytes, trace=True, backend=None):
+    return encrypt_with_context(text, get_key_context(bytes(key_bytes)), trace, backend)
+
+
+def encrypt_with_context(text, context, trace=True, backend=None):
+    """
+    Encrypt with an already built KeyContext, e.g. one loaded from the keyring.
+
+    Round details are only produced by the reference implementation. Without trace, the blocks
+    go through the cipher backend chosen by backends.select_backend (backend forces one),
+    unless the text has characters outside Latin-1, which only the reference handles.
+    """
+    padded_text = pad_text(text)
+    if not trace:
+        try:
+            data = padded_text.encode('latin1')
+        except UnicodeEncodeError:
+            data = None
+        if data is not None:
+            ciphertext = _encrypt_bytes_memo(data, context, backend)
+            return base64.b64encode(ciphertext).decode('ascii'), _bitshift_bits_matrices(data), []
+
+    matrices = split_string_to_column_major_matrix(padded_text)
+    encrypted_matrices, bitshift_bits_matrices, all_round_details = _encrypt_matrices(matrices, context, trace)
+
     encrypted_text = merge_matrices_to_text(encrypted_matrices)
     encrypted_text_bytes = encrypted_text.encode('latin1')
     encrypted_text_base64 = base64.b64encode(encrypted_text_bytes).decode('ascii')
     return encrypted_text_base64, bitshift_bits_matrices, all_round_details
 
 
-def decrypt(encrypted_text_base64, key_hex, bitshift_matrices):
+def decrypt(encrypted_text_base64, key_hex, bitshift_matrices, backend=None):
+    return decrypt_with_context(encrypted_text_base64, get_key_context(bytes.fromhex(key_hex)),
+                                bitshift_matrices, backend)
+
+
+def decrypt_with_context(encrypted_text_base64, context, bitshift_matrices, backend=None):
     # Decode the Base64-encoded encrypted text
     encrypted_text_bytes = base64.b64decode(encrypted_text_base64)
+
+    if len(encrypted_text_bytes) == 16 * len(bitshift_matrices):
+        bitshift_bits = bytes(matrix[row][col] for matrix in bitshift_matrices for col in range(4) for row in range(4))
+        plaintext = select_backend(len(bitshift_matrices), backend).decrypt_bytes(
+            encrypted_text_bytes, bitshift_bits, context)
+        return unpad_text(plaintext.decode('latin1'))
+
     encrypted_text = encrypted_text_bytes.decode('latin1')  # Use 'latin1' to get original bytes
 
-    key_bytes = bytes.fromhex(key_hex)
     padded_text = encrypted_text  # Since it's already padded during encryption
 
     matrices = split_string_to_column_major_matrix(padded_text)
-    key_matrix = generate_key_matrix(key_bytes)
-    round_keys = key_expansion(key_matrix)
-
-    # Generate key-dependent S-Box
-    sbox, inverse_sbox = generate_key_dependent_sbox(key_bytes)
+    round_keys, inverse_sbox = context.round_keys, context.inverse_sbox
 
     decrypted_matrices = []
 
@@ -74,3 +181,141 @@ def decrypt(encrypted_text_base64, key_hex, bitshift_matrices):
     unpadded_text = unpad_text(decrypted_text)
     return unpadded_text
 
+
+def trace_rounds(text, context, start=0, count=None):
+    """
+    Round details of count blocks of a plaintext from block start, exactly as encrypt with
+    trace reports them. Only those blocks are encrypted. Returns (total blocks, round details).
+    """
+    padded_text = pad_text(text)
+    total_blocks = len(padded_text) // 16
+    stop = total_blocks if count is None else min(total_blocks, start + count)
+    matrices = split_string_to_column_major_matrix(padded_text[start * 16:stop * 16])
+    return total_blocks, _encrypt_matrices(matrices, context, True, start)[2]
+
+
+def trace_ciphertext_rounds(encrypted_text_base64, bitshift_matrices, context, start=0, count=None):
+    """
+    Like trace_rounds for a ciphertext and its bitshift matrices: the requested blocks are
+    decrypted and encrypted again with trace.
+    """
+    encrypted_text = base64.b64decode(encrypted_text_base64).decode('latin1')
+    total_blocks = min(len(encrypted_text) // 16, len(bitshift_matrices))
+    stop = total_blocks if count is None else min(total_blocks, start + count)
+    matrices = [
+        decrypt_block(matrix, bitshift_matrices[block_index], context.round_keys, context.inverse_sbox)
+        for block_index, matrix in enumerate(
+            split_string_to_column_major_matrix(encrypted_text[start * 16:stop * 16]), start)
+    ]
+    return total_blocks, _encrypt_matrices(matrices, context, True, start)[2]
+
+
+# Translation tables moving the bitshift bits of a byte to/from one of the four 2-bit fields of a packed byte
+_PACK_BITS = [bytes((x & 0b11) << shift for x in range(256)) for shift in (0, 2, 4, 6)]
+_UNPACK_BITS = [bytes((x >> shift) & 0b11 for x in range(256)) for shift in (0, 2, 4, 6)]
+
+
+def pack_bitshift_bits(data):
+    """
+    Pack the bitshift bits (two low bits) of every byte of data, four to a byte:
+    byte j holds those of bytes 4j to 4j + 3, lowest bits first. len(data) must be a multiple of 4.
+    """
+    packed = 0
+    for field in range(4):
+        packed |= int.from_bytes(data[field::4].translate(_PACK_BITS[field]), 'little')
+    return packed.to_bytes(len(data) // 4, 'little')
+
+
+def unpack_bitshift_bits(packed):
+    """Inverse of pack_bitshift_bits: one byte per bitshift bits pair, in text order."""
+    bits = bytearray(len(packed) * 4)
+    for field in range(4):
+        bits[field::4] = packed.translate(_UNPACK_BITS[field])
+    return bytes(bits)
+
+
+def pack_encryption(encrypted_text_base64, bitshift_bits_matrices, round_details):
+    """
+    Compact binary form of an encrypt result for the result cache: the raw ciphertext, the
+    bitshift bits packed four to a byte and the compressed round details, if any.
+    """
+    ciphertext = base64.b64decode(encrypted_text_base64)
+    packed_bits = pack_bitshift_bits(
+        bytes(matrix[row][col] for matrix in bitshift_bits_matrices for col in range(4) for row in range(4)))
+    rounds = pack_json(round_details) if round_details else b''
+    return struct.pack('<II', len(ciphertext), len(rounds)) + ciphertext + packed_bits + rounds
+
+
+def unpack_encryption(blob):
+    """Inverse of pack_encryption, returning the same tuple as encrypt."""
+    ciphertext_size, rounds_size = struct.unpack_from('<II', blob)
+    ciphertext = blob[8:8 + ciphertext_size]
+    packed_bits = blob[8 + ciphertext_size:8 + ciphertext_size + ciphertext_size // 4]
+    round_details = unpack_json(blob[len(blob) - rounds_size:]) if rounds_size else []
+    return (base64.b64encode(ciphertext).decode('ascii'), _bitshift_bits_matrices(unpack_bitshift_bits(packed_bits)),
+            round_details)
+
+
+# A streamed block: 16 ciphertext bytes followed by its 16 bitshift bits pairs packed into 4 bytes
+STREAM_RECORD_SIZE = 20
+
+
+def _stream_records(ciphertext, packed_bits):
+    return b''.join(ciphertext[block * 16:block * 16 + 16] + packed_bits[block * 4:block * 4 + 4]
+                    for block in range(len(ciphertext) // 16))
+
+
+def encrypt_stream(chunks, context, backend=None):
+    """
+    Encrypt a byte stream given as an iterable of chunks of any size, with PKCS#7 padding.
+    Every complete block is encrypted as soon as its chunk arrives, and one STREAM_RECORD_SIZE
+    record per block is yielded, so memory is bounded by the chunk size. The block memo is
+    not used: stream chunks are large and rarely repeat.
+    The ciphertext equals encrypt of the stream decoded as Latin-1.
+    """
+    pending = b''
+    for chunk in chunks:
+        pending += chunk
+        usable = len(pending) - len(pending) % 16
+        if usable:
+            data, pending = pending[:usable], pending[usable:]
+            ciphertext = select_backend(usable // 16, backend).encrypt_bytes(data, context)
+            yield _stream_records(ciphertext, pack_bitshift_bits(data))
+
+    pad_len = 16 - len(pending)
+    data = pending + bytes([pad_len]) * pad_len
+    ciphertext = select_backend(1, backend).encrypt_bytes(data, context)
+    yield _stream_records(ciphertext, pack_bitshift_bits(data))
+
+
+def decrypt_stream(chunks, context, backend=None):
+    """
+    Decrypt a stream of encrypt_stream records given as an iterable of chunks of any size.
+    The last block is held back until the stream ends so its PKCS#7 padding can be checked and
+    removed. Raises ValueError if the stream is empty, does not end on a record boundary or
+    its last block is not correctly padded.
+    """
+    pending = b''
+    held = b''
+    for chunk in chunks:
+        pending += chunk
+        usable = len(pending) - len(pending) % STREAM_RECORD_SIZE
+        if not usable:
+            continue
+        records, pending = pending[:usable], pending[usable:]
+        num_blocks = usable // STREAM_RECORD_SIZE
+        ciphertext = b''.join(records[i:i + 16] for i in range(0, usable, STREAM_RECORD_SIZE))
+        bits = unpack_bitshift_bits(b''.join(records[i + 16:i + 20] for i in range(0, usable, STREAM_RECORD_SIZE)))
+        plaintext = held + select_backend(num_blocks, backend).decrypt_bytes(ciphertext, bits, context)
+        held = plaintext[-16:]
+        if len(plaintext) > 16:
+            yield plaintext[:-16]
+
+    if pending:
+        raise ValueError("Stream does not end on a block record boundary")
+    if not held:
+        raise ValueError("Stream has no blocks")
+    pad_len = held[-1]
+    if not 1 <= pad_len <= 16 or held[-pad_len:] != bytes([pad_len]) * pad_len:
+        raise ValueError("Invalid padding in the last block")
+    yield held[:-pad_len]
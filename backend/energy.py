@@ -0,0 +1,144 @@
+import abc
+import os
+import time
+
+import numpy as np
+
+from batch_engine import context_arrays, encrypt_blocks
+from encryption import get_key_context
+from powercap import POWERCAP_ROOT, find_rapl_domain
+
+
+class EnergyBackend(abc.ABC):
+    """Source of a cumulative energy counter in microjoules."""
+
+    name = None
+
+    @abc.abstractmethod
+    def read_uj(self):
+        pass
+
+    def max_range_uj(self):
+        return None
+
+    def delta_uj(self, before, after):
+        """Energy between two readings, allowing for one wraparound of the counter."""
+        if after < before and self.max_range_uj():
+            return after + self.max_range_uj() - before
+        return after - before
+
+
+class PowercapBackend(EnergyBackend):
+    """Reads a RAPL domain of the Linux powercap interface, e.g. /sys/class/powercap/intel-rapl:0."""
+
+    name = 'rapl'
+
+    def __init__(self, domain_path):
+        self.domain_path = domain_path
+        with open(os.path.join(domain_path, 'max_energy_range_uj')) as f:
+            self._max_range_uj = int(f.read())
+        name_path = os.path.join(domain_path, 'name')
+        if os.path.exists(name_path):
+            with open(name_path) as f:
+                self.domain = f.read().strip()
+        else:
+            self.domain = os.path.basename(domain_path)
+
+    def read_uj(self):
+        with open(os.path.join(self.domain_path, 'energy_uj')) as f:
+            return int(f.read())
+
+    def max_range_uj(self):
+        return self._max_range_uj
+
+
+class FileEnergyBackend(EnergyBackend):
+    """
+    Reads the counter from a plain file, for testing and for hosts without RAPL.
+    With watts set, every reading first advances the counter as if the given power had been
+    drawn for the CPU time the reading thread used since the previous reading, so the backend
+    works without any other writer and an idle thread draws nothing.
+    """
+
+    name = 'file'
+
+    def __init__(self, path, watts=None):
+        self.path = path
+        self.watts = watts
+        self._last_read = time.thread_time()
+        if not os.path.exists(path):
+            with open(path, 'w') as f:
+                f.write('0')
+
+    def read_uj(self):
+        with open(self.path) as f:
+            value = int(f.read() or 0)
+        if self.watts is not None:
+            now = time.thread_time()
+            value += int((now - self._last_read) * self.watts * 1e6)
+            self._last_read = now
+            with open(self.path, 'w') as f:
+                f.write(str(value))
+        return value
+
+
+def get_energy_backend(name=None):
+    """
+    Energy backend selected by name or by the ENERGY_BACKEND environment variable.
+    'rapl' reads the powercap interface (POWERCAP_ROOT overrides its location), 'file' reads
+    ENERGY_FILE, simulating ENERGY_FILE_WATTS if set. Without a name RAPL is used when available.
+    """
+    name = name or os.environ.get('ENERGY_BACKEND', 'rapl')
+    if name == 'rapl':
+        domain_path = find_rapl_domain(os.environ.get('POWERCAP_ROOT', POWERCAP_ROOT))
+        if domain_path is None:
+            raise RuntimeError("No readable RAPL domain found under the powercap interface.")
+        return PowercapBackend(domain_path)
+    if name == 'file':
+        path = os.environ.get('ENERGY_FILE')
+        if not path:
+            raise RuntimeError("ENERGY_FILE must be set for the file energy backend.")
+        watts = os.environ.get('ENERGY_FILE_WATTS')
+        return FileEnergyBackend(path, float(watts) if watts else None)
+    raise ValueError(f"Unknown energy backend: {name}")
+
+
+def power_consumption_analysis(num_samples, key_bytes, backend=None, blocks_per_sample=4096, idle_seconds=0.05,
+                               seed=None):
+    """
+    Energy per encrypted block measured with an energy counter.
+
+    For each sample, blocks_per_sample random blocks are encrypted in one batch between two
+    counter readings. The idle power, measured once over idle_seconds, is subtracted so the
+    result is the energy spent on encryption. Returns microjoules per block for every sample.
+    """
+    backend = backend or get_energy_backend()
+    round_keys, sbox = context_arrays(get_key_context(bytes(key_bytes)))
+    rng = np.random.default_rng(seed)
+
+    # Idle power baseline
+    before = backend.read_uj()
+    start = time.perf_counter()
+    time.sleep(idle_seconds)
+    idle_watts = backend.delta_uj(before, backend.read_uj()) / 1e6 / (time.perf_counter() - start)
+
+    samples = []
+    for _ in range(num_samples):
+        blocks = rng.integers(0, 256, size=(blocks_per_sample, 16), dtype=np.uint8)
+
+        before = backend.read_uj()
+        start = time.perf_counter()
+        encrypt_blocks(blocks, round_keys, sbox)
+        elapsed = time.perf_counter() - start
+        energy_uj = backend.delta_uj(before, backend.read_uj())
+
+        net_uj = max(0.0, energy_uj - idle_watts * elapsed * 1e6)
+        samples.append(net_uj / blocks_per_sample)
+
+    return {
+        'backend': backend.name,
+        'blocks_per_sample': blocks_per_sample,
+        'idle_watts': idle_watts,
+        'microjoules_per_block': samples,
+        'mean_microjoules_per_block': sum(samples) / len(samples) if samples else 0.0,
+    }
@@ -0,0 +1,16 @@
+import base64
+
+from encryption import encrypt
+
+
+def hamming_weight_analysis(input_text, key_bytes):
+    """
+    Calculates the Hamming weight of every encrypted block.
+    Encryption is deterministic, so the text is encrypted once; see cpa.py for simulated power traces.
+    """
+    encrypted_text_base64, _, _ = encrypt(input_text, key_bytes, trace=False)
+    # Decode the base64 encoded encrypted text
+    encrypted_bytes = base64.b64decode(encrypted_text_base64.encode('ascii'))
+
+    return [sum(bin(byte).count('1') for byte in encrypted_bytes[i:i + 16])
+            for i in range(0, len(encrypted_bytes), 16)]
@@ -0,0 +1,65 @@
+import numpy as np
+
+from batch_engine import POPCOUNT, encrypt_blocks, generate_key_dependent_sboxes, key_expansion_batch
+
+# Mask of every single-bit flip of a key: row i flips bit i (most significant bit of byte 0 first)
+KEY_BIT_FLIP_MASKS = np.packbits(np.eye(256, dtype=np.uint8), axis=1)
+
+
+def _summary(values):
+    return {
+        'mean': float(values.mean()),
+        'std': float(values.std()),
+        'min': float(values.min()),
+        'max': float(values.max()),
+    }
+
+
+def key_avalanche_analysis(key_bytes, num_blocks=16, seed=None):
+    """
+    Sensitivity of the cipher to single-bit key changes.
+
+    The base key and its 256 single-bit-flip neighbours are set up in one batch (key expansion
+    and key-dependent S-Boxes), then a random plaintext corpus of num_blocks blocks is encrypted
+    under all of them in one pass. Reports the Hamming distance between the ciphertexts of the
+    base key and of each neighbour, how much of the S-Box each neighbour shares with the base
+    S-Box, and how far each round key moves.
+    """
+    rng = np.random.default_rng(seed)
+    base_key = np.frombuffer(bytes(key_bytes), dtype=np.uint8)
+
+    # Key 0 is the base key, key i + 1 has bit i flipped
+    keys = np.concatenate([base_key[None], base_key ^ KEY_BIT_FLIP_MASKS])
+    round_keys = key_expansion_batch(keys)
+    sboxes, _ = generate_key_dependent_sboxes(keys)
+
+    corpus = rng.integers(0, 256, size=(num_blocks, 16), dtype=np.uint8)
+    key_index = np.repeat(np.arange(keys.shape[0]), num_blocks)
+    ciphertext, _, _ = encrypt_blocks(np.tile(corpus, (keys.shape[0], 1)), round_keys, sboxes, key_index)
+    ciphertext = ciphertext.reshape(keys.shape[0], num_blocks, 16)
+
+    distances = POPCOUNT[ciphertext[1:] ^ ciphertext[0]].sum(axis=-1, dtype=np.int64)  # (256, blocks)
+    per_key_bit = distances.mean(axis=1) / 128
+
+    sbox_similarity = (sboxes[1:] == sboxes[0]).mean(axis=1)
+    sbox_distances = POPCOUNT[sboxes[1:] ^ sboxes[0]].sum(axis=1, dtype=np.int64) / (256 * 8)
+
+    round_key_distances = POPCOUNT[round_keys[1:] ^ round_keys[0]].sum(axis=(2, 3), dtype=np.int64)  # (256, 15)
+    round_key_curve = round_key_distances.mean(axis=0) / 128
+
+    return {
+        'num_keys': int(keys.shape[0]),
+        'num_blocks': num_blocks,
+        'ciphertext_hamming_distance': {
+            **_summary(distances),
+            'distribution': np.bincount(distances.ravel(), minlength=129).tolist(),
+            'per_key_bit': per_key_bit.round(4).tolist(),
+        },
+        'sbox_similarity': {
+            'equal_entries': _summary(sbox_similarity),
+            'flipped_bits': _summary(sbox_distances),
+            'per_key_bit': sbox_similarity.round(4).tolist(),
+        },
+        'round_key_diffusion': [{'round': round, 'flipped_fraction': float(fraction)}
+                                for round, fraction in enumerate(round_key_curve)],
+    }
@@ -0,0 +1,205 @@
+import mmap
+import os
+import secrets
+import struct
+import threading
+import zlib
+
+from encryption import KeyContext, get_key_context
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialised within the process
+    fcntl = None
+
+MAGIC = b'CKR1'
+VERSION = 1
+
+# Header: magic, version, record size
+HEADER = struct.Struct('<4sHH8x')
+
+KEY_ID_SIZE = 16
+KEY_SIZE = 32
+ROUND_KEYS_SIZE = 15 * 16
+
+# Record: key id, key, round keys (15 rounds of 16 bytes, row-major), S-Box, inverse S-Box, CRC32
+RECORD = struct.Struct(f'<{KEY_ID_SIZE}s{KEY_SIZE}s{ROUND_KEYS_SIZE}s256s256sI')
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'keyring.bin')
+
+
+class UnknownKey(KeyError):
+    pass
+
+
+class CorruptKeyring(ValueError):
+    pass
+
+
+def _serialize(key_id, key_bytes, context):
+    round_keys = bytes(byte for round_key in context.round_keys for row in round_key for byte in row)
+    body = RECORD.pack(key_id, key_bytes, round_keys, bytes(context.sbox), bytes(context.inverse_sbox), 0)
+    return body[:-4] + struct.pack('<I', zlib.crc32(body[:-4]))
+
+
+def _deserialize(record):
+    key_id, key_bytes, round_keys, sbox, inverse_sbox, checksum = RECORD.unpack(record)
+    if zlib.crc32(record[:-4]) != checksum:
+        raise CorruptKeyring(f"Checksum mismatch for key {key_id.hex()}")
+    # The records already hold the round keys in the flat BlockState layout
+    flat_round_keys = tuple(int.from_bytes(round_keys[offset:offset + 16], 'big')
+                            for offset in range(0, ROUND_KEYS_SIZE, 16))
+    round_keys = [
+        [list(round_keys[offset + row * 4:offset + row * 4 + 4]) for row in range(4)]
+        for offset in range(0, ROUND_KEYS_SIZE, 16)
+    ]
+    return key_bytes, KeyContext(round_keys, list(sbox), list(inverse_sbox), flat_round_keys)
+
+
+def _parse_key_id(key_id):
+    try:
+        raw = bytes.fromhex(key_id)
+    except (TypeError, ValueError):
+        raise UnknownKey(key_id) from None
+    if len(raw) != KEY_ID_SIZE:
+        raise UnknownKey(key_id)
+    return raw
+
+
+class KeyStore:
+    """
+    Keys stored under opaque ids, with their expanded round keys and S-Boxes, in one binary file.
+
+    The file is a fixed header followed by fixed-size records and is only ever appended to, under
+    an exclusive file lock. Every process maps it read-only and remaps it when a lookup misses,
+    so keys added by another worker are found and no process repeats the key setup.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._map = None
+        self._mapped_size = 0
+        self._offsets = {}
+        self._order = []
+        self._contexts = {}
+
+    def _locked_file(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        if os.fstat(fd).st_size == 0:
+            os.write(fd, HEADER.pack(MAGIC, VERSION, RECORD.size))
+        return fd
+
+    def _refresh(self):
+        """Map the file again if it has grown since it was last mapped. Called under self._lock."""
+        if not os.path.exists(self.path):
+            os.close(self._locked_file())
+        size = os.path.getsize(self.path)
+        if size < HEADER.size or size == self._mapped_size:
+            return
+
+        with open(self.path, 'rb') as f:
+            new_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size = HEADER.unpack_from(new_map)
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            new_map.close()
+            raise CorruptKeyring(f"{self.path} is not a version {VERSION} keyring")
+
+        # A record still being written by another process is picked up on the next refresh
+        complete = HEADER.size + (size - HEADER.size) // RECORD.size * RECORD.size
+        for offset in range(HEADER.size + len(self._order) * RECORD.size, complete, RECORD.size):
+            key_id = new_map[offset:offset + KEY_ID_SIZE]
+            self._offsets[key_id] = offset
+            self._order.append(key_id)
+
+        # Contexts already handed out keep their own copies, so the old map can be released
+        if self._map is not None:
+            self._map.close()
+        self._map = new_map
+        self._mapped_size = complete
+
+    def _append(self, key_bytes, only_if_empty=False):
+        context = get_key_context(bytes(key_bytes))
+        key_id = secrets.token_bytes(KEY_ID_SIZE)
+        fd = self._locked_file()
+        try:
+            size = os.fstat(fd).st_size
+            if only_if_empty and size > HEADER.size:
+                return None
+            os.lseek(fd, HEADER.size + (size - HEADER.size) // RECORD.size * RECORD.size, os.SEEK_SET)
+            os.write(fd, _serialize(key_id, bytes(key_bytes), context))
+            os.fsync(fd)
+        finally:
+            os.close(fd)  # Also releases the lock
+        return key_id
+
+    def add_key(self, key_bytes=None):
+        """Store a key (a random one by default) and return its id as hex."""
+        if key_bytes is None:
+            key_bytes = secrets.token_bytes(KEY_SIZE)
+        if len(key_bytes) != KEY_SIZE:
+            raise ValueError("Key must be 32 bytes long")
+        key_id = self._append(key_bytes)
+        with self._lock:
+            self._refresh()
+        return key_id.hex()
+
+    def _load(self, key_id):
+        raw = _parse_key_id(key_id)
+        with self._lock:
+            if raw not in self._contexts:
+                if raw not in self._offsets:
+                    self._refresh()
+                offset = self._offsets.get(raw)
+                if offset is None:
+                    raise UnknownKey(key_id)
+                self._contexts[raw] = _deserialize(self._map[offset:offset + RECORD.size])
+            return self._contexts[raw]
+
+    def get_context(self, key_id):
+        """The KeyContext of a stored key, read from the file without any key setup."""
+        return self._load(key_id)[1]
+
+    def get_key(self, key_id):
+        return self._load(key_id)[0]
+
+    def __contains__(self, key_id):
+        try:
+            self._load(key_id)
+        except UnknownKey:
+            return False
+        return True
+
+    def key_ids(self):
+        with self._lock:
+            self._refresh()
+            return [key_id.hex() for key_id in self._order]
+
+    def default_key_id(self, generate_key=None):
+        """
+        The id of the first key in the file. An empty keyring gets a key from generate_key
+        (random by default); only one of several workers starting together writes it.
+        """
+        with self._lock:
+            self._refresh()
+            if self._order:
+                return self._order[0].hex()
+        self._append(generate_key() if generate_key else secrets.token_bytes(KEY_SIZE), only_if_empty=True)
+        with self._lock:
+            self._refresh()
+            return self._order[0].hex()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_key_store():
+    """The process-wide key store at KEYRING_PATH (backend/keyring.bin by default)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = KeyStore(os.environ.get('KEYRING_PATH', DEFAULT_PATH))
+        return _store
@@ -0,0 +1,287 @@
+"""
+Load generator for the /api routes.
+
+    python loadtest.py scenarios/mixed.json [--url http://127.0.0.1:5000] [--output report.json]
+
+Without --url the backend is started locally on a free port and stopped afterwards. The
+scenario file fixes the route mix, payload sizes, load mode and seed, so running the same
+file again replays the same sequence of requests. The report is written as JSON.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import socket
+import string
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+TEXT_ALPHABET = string.ascii_letters + string.digits + ' .,'
+
+
+def sample_size(spec, rng):
+    """
+    Draw a payload size from a spec: an int, {"values": [...], "weights": [...]},
+    {"uniform": [low, high]} or {"lognormal": {"median": m, "sigma": s}}, optionally capped by "max".
+    """
+    if isinstance(spec, int):
+        return spec
+    if 'values' in spec:
+        size = rng.choices(spec['values'], weights=spec.get('weights'))[0]
+    elif 'uniform' in spec:
+        size = rng.randint(*spec['uniform'])
+    elif 'lognormal' in spec:
+        size = int(rng.lognormvariate(math.log(spec['lognormal']['median']), spec['lognormal']['sigma']))
+    else:
+        raise ValueError(f"Unknown size spec: {spec}")
+    return max(0, min(size, spec.get('max', size)))
+
+
+def build_value(template, rng):
+    """Fill a payload template: {"$text": size spec} becomes random text of that length."""
+    if isinstance(template, dict):
+        if '$text' in template:
+            return ''.join(rng.choices(TEXT_ALPHABET, k=sample_size(template['$text'], rng)))
+        return {name: build_value(value, rng) for name, value in template.items()}
+    if isinstance(template, list):
+        return [build_value(value, rng) for value in template]
+    return template
+
+
+def build_requests(scenario, count):
+    """The first count requests of a scenario, drawn from its seeded random generator."""
+    rng = random.Random(scenario.get('seed', 0))
+    routes = scenario['routes']
+    weights = [route.get('weight', 1) for route in routes]
+    for _ in range(count):
+        route = rng.choices(routes, weights=weights)[0]
+        path = route['path']
+        if 'query' in route:
+            path += '?' + urllib.parse.urlencode(build_value(route['query'], rng))
+        body = None
+        if 'json' in route:
+            body = json.dumps(build_value(route['json'], rng)).encode('utf-8')
+        yield route['name'], route.get('method', 'POST' if body is not None else 'GET'), path, body
+
+
+def send(base_url, method, path, body, timeout):
+    """Send one request and read the whole response, including event streams. Returns (status, bytes)."""
+    request = urllib.request.Request(base_url + path, data=body, method=method)
+    if body is not None:
+        request.add_header('Content-Type', 'application/json')
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, len(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, len(e.read())
+    except (OSError, urllib.error.URLError) as e:
+        return type(e).__name__, 0
+
+
+def read_rss_kb(pid):
+    try:
+        with open(f'/proc/{pid}/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))]
+
+
+def summarize(samples, elapsed):
+    latencies = sorted(sample['latency'] * 1000 for sample in samples)
+    errors = {}
+    for sample in samples:
+        if not isinstance(sample['status'], int) or sample['status'] >= 400:
+            errors[str(sample['status'])] = errors.get(str(sample['status']), 0) + 1
+    return {
+        'requests': len(samples),
+        'throughput_rps': len(samples) / elapsed if elapsed else 0.0,
+        'errors': errors,
+        'error_rate': sum(errors.values()) / len(samples) if samples else 0.0,
+        'response_bytes': sum(sample['bytes'] for sample in samples),
+        'latency_ms': {
+            'mean': sum(latencies) / len(latencies) if latencies else None,
+            'p50': percentile(latencies, 0.50),
+            'p95': percentile(latencies, 0.95),
+            'p99': percentile(latencies, 0.99),
+            'max': latencies[-1] if latencies else None,
+        },
+    }
+
+
+class LoadRun:
+    def __init__(self, scenario, base_url, server_pid=None):
+        self.scenario = scenario
+        self.base_url = base_url.rstrip('/')
+        self.server_pid = server_pid
+        self.timeout = scenario.get('timeout', 60)
+        self.samples = []
+        self.timeline = []
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def _record(self, name, scheduled, method, path, body):
+        status, size = send(self.base_url, method, path, body, self.timeout)
+        finished = time.perf_counter()
+        with self._lock:
+            self.samples.append({
+                'route': name,
+                # Measured from the scheduled start, so queueing behind a slow server counts as latency
+                'latency': finished - scheduled,
+                'finished': finished,
+                'status': status,
+                'bytes': size,
+            })
+
+    def _sample_server(self, start, interval):
+        completed = errors = 0
+        while not self._done.wait(interval):
+            with self._lock:
+                new = self.samples[completed:]
+                completed = len(self.samples)
+            errors += sum(1 for s in new if not isinstance(s['status'], int) or s['status'] >= 400)
+            rss = read_rss_kb(self.server_pid) if self.server_pid else None
+            self.timeline.append({
+                't': round(time.perf_counter() - start, 3),
+                'completed': completed,
+                'errors': errors,
+                'interval_rps': len(new) / interval,
+                'server_rss_mb': rss / 1024 if rss is not None else None,
+            })
+
+    def _fixed_rate(self, start, duration, rate):
+        # Open loop: request i is sent at start + i / rate whatever the server's latency
+        count = int(duration * rate)
+        with ThreadPoolExecutor(max_workers=self.scenario.get('max_in_flight', 256)) as pool:
+            for index, request in enumerate(build_requests(self.scenario, count)):
+                scheduled = start + index / rate
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(self._record, request[0], scheduled, *request[1:])
+
+    def _fixed_concurrency(self, start, duration, concurrency):
+        # Closed loop: each worker sends its next request as soon as the previous one completes
+        requests = build_requests(self.scenario, sys.maxsize)
+        requests_lock = threading.Lock()
+
+        def worker():
+            while time.perf_counter() - start < duration:
+                with requests_lock:
+                    request = next(requests)
+                self._record(request[0], time.perf_counter(), *request[1:])
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def run(self):
+        duration = self.scenario.get('duration', 10)
+        start = time.perf_counter()
+        sampler = threading.Thread(target=self._sample_server, args=(start, self.scenario.get('sample_interval', 1.0)))
+        sampler.start()
+        try:
+            if 'rate' in self.scenario:
+                self._fixed_rate(start, duration, self.scenario['rate'])
+            else:
+                self._fixed_concurrency(start, duration, self.scenario.get('concurrency', 4))
+        finally:
+            self._done.set()
+            sampler.join()
+        elapsed = time.perf_counter() - start
+
+        report = {
+            'scenario': self.scenario.get('name'),
+            'mode': 'rate' if 'rate' in self.scenario else 'concurrency',
+            'target': self.scenario.get('rate', self.scenario.get('concurrency', 4)),
+            'seed': self.scenario.get('seed', 0),
+            'duration_s': elapsed,
+            **summarize(self.samples, elapsed),
+            'routes': {
+                route['name']: summarize([s for s in self.samples if s['route'] == route['name']], elapsed)
+                for route in self.scenario['routes']
+            },
+            'timeline': self.timeline,
+        }
+        rss = [point['server_rss_mb'] for point in self.timeline if point['server_rss_mb'] is not None]
+        report['server_rss_mb'] = {'start': rss[0], 'end': rss[-1], 'max': max(rss)} if rss else None
+        return report
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, startup_timeout=60):
+    """Start app.py with Flask's threaded server (no reloader, so the pid is the server's own)."""
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'flask', '--app', 'app', 'run', '--port', str(port), '--with-threads', '--no-reload'],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + startup_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Backend exited with code {process.returncode}")
+        if send(base_url, 'GET', '/api/analyses', None, 1)[0] == 200:
+            return process, base_url
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Backend did not start in time")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('scenario', help='scenario JSON file')
+    parser.add_argument('--url', help='use a running server instead of starting one')
+    parser.add_argument('--pid', type=int, help='pid of the running server, for RSS sampling')
+    parser.add_argument('--output', help='write the report here instead of stdout')
+    args = parser.parse_args(argv)
+
+    with open(args.scenario) as f:
+        scenario = json.load(f)
+
+    process = None
+    if args.url:
+        base_url, pid = args.url, args.pid
+    else:
+        process, base_url = start_server(_free_port())
+        pid = process.pid
+    try:
+        report = LoadRun(scenario, base_url, pid).run()
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,6 @@
+from state import BlockState
+
+
 def split_string_to_column_major_matrix(text):
     """Convert text to a list of 4x4 matrices in column-major order."""
     matrices = []
@@ -23,18 +26,18 @@ def merge_matrices_to_text(matrices):
     return text
 
 
+# The round stages below are adapters from 4x4 matrices to the in-place BlockState stages
+
 def shift_rows(matrix):
-    shifted_matrix = [row[:] for row in matrix]
-    for i in range(1, 4):
-        shifted_matrix[i] = matrix[i][i:] + matrix[i][:i]
-    return shifted_matrix
+    state = BlockState.from_matrix(matrix)
+    state.shift_rows()
+    return state.to_matrix()
 
 
 def inverse_shift_rows(matrix):
-    unshifted_matrix = [row[:] for row in matrix]
-    for i in range(1, 4):
-        unshifted_matrix[i] = matrix[i][-i:] + matrix[i][:-i]
-    return unshifted_matrix
+    state = BlockState.from_matrix(matrix)
+    state.inverse_shift_rows()
+    return state.to_matrix()
 
 
 def transpose(matrix):
@@ -54,24 +57,14 @@ def galois_mult(a, b):
 
 
 def mix_columns(matrix):
-    for col in range(4):
-        a = [matrix[row][col] for row in range(4)]
-        matrix[0][col] = (galois_mult(a[0], 2) ^ galois_mult(a[1], 3) ^ a[2] ^ a[3]) % 256
-        matrix[1][col] = (a[0] ^ galois_mult(a[1], 2) ^ galois_mult(a[2], 3) ^ a[3]) % 256
-        matrix[2][col] = (a[0] ^ a[1] ^ galois_mult(a[2], 2) ^ galois_mult(a[3], 3)) % 256
-        matrix[3][col] = (galois_mult(a[0], 3) ^ a[1] ^ a[2] ^ galois_mult(a[3], 2)) % 256
+    state = BlockState.from_matrix(matrix)
+    state.mix_columns()
+    matrix[:] = state.to_matrix()
     return matrix
 
 
 def inverse_mix_columns(matrix):
-    for col in range(4):
-        a = [matrix[row][col] for row in range(4)]
-        matrix[0][col] = (galois_mult(a[0], 14) ^ galois_mult(a[1], 11) ^
-                          galois_mult(a[2], 13) ^ galois_mult(a[3], 9)) % 256
-        matrix[1][col] = (galois_mult(a[0], 9) ^ galois_mult(a[1], 14) ^
-                          galois_mult(a[2], 11) ^ galois_mult(a[3], 13)) % 256
-        matrix[2][col] = (galois_mult(a[0], 13) ^ galois_mult(a[1], 9) ^
-                          galois_mult(a[2], 14) ^ galois_mult(a[3], 11)) % 256
-        matrix[3][col] = (galois_mult(a[0], 11) ^ galois_mult(a[1], 13) ^
-                          galois_mult(a[2], 9) ^ galois_mult(a[3], 14)) % 256
+    state = BlockState.from_matrix(matrix)
+    state.inverse_mix_columns()
+    matrix[:] = state.to_matrix()
     return matrix
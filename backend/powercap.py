@@ -0,0 +1,16 @@
+import glob
+import os
+
+# Kept apart from energy.py so analyses can look for a RAPL domain without importing NumPy
+POWERCAP_ROOT = '/sys/class/powercap'
+
+
+def find_rapl_domain(root=POWERCAP_ROOT):
+    """Path of the first readable RAPL package domain, or None."""
+    for domain_path in sorted(glob.glob(os.path.join(root, 'intel-rapl:*'))):
+        # Sub-domains (intel-rapl:0:0, ...) only cover parts of the package
+        if os.path.basename(domain_path).count(':') != 1:
+            continue
+        if os.access(os.path.join(domain_path, 'energy_uj'), os.R_OK):
+            return domain_path
+    return None
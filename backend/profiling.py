@@ -0,0 +1,253 @@
+import cProfile
+import os
+import pstats
+import random
+import string
+import sys
+import threading
+import time
+from collections import Counter
+
+from encryption import decrypt_with_context, encrypt_with_context, get_key_context, trace_rounds
+
+PROFILE_MODES = ('cprofile', 'sampling')
+
+# Only one profile runs at a time, and runs start at least PROFILE_MIN_INTERVAL seconds apart
+PROFILE_MIN_INTERVAL = float(os.environ.get('PROFILE_MIN_INTERVAL', 5))
+
+# Collapsed-stack paths are cut at this depth, and cProfile paths worth less than a microsecond are dropped
+MAX_STACK_DEPTH = 64
+
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+
+def _random_texts(size, count):
+    # Seeded afresh for every profile: repeated payloads would be answered by the block memo
+    rng = random.Random(os.urandom(16))
+    return [''.join(rng.choices(string.ascii_letters + string.digits + ' ', k=size)) for _ in range(count)]
+
+
+def _encrypt_workload(key_bytes, payload_size, count):
+    texts, context = _random_texts(payload_size, count), get_key_context(key_bytes)
+    return lambda index: encrypt_with_context(texts[index], context, trace=False)
+
+
+def _decrypt_workload(key_bytes, payload_size, count):
+    context = get_key_context(key_bytes)
+    encrypted = [encrypt_with_context(text, context, trace=False) for text in _random_texts(payload_size, count)]
+    return lambda index: decrypt_with_context(encrypted[index][0], context, encrypted[index][1])
+
+
+def _rounds_workload(key_bytes, payload_size, count):
+    texts, context = _random_texts(payload_size, count), get_key_context(key_bytes)
+    return lambda index: trace_rounds(texts[index], context)
+
+
+def _advanced_tests_workload(key_bytes, payload_size, count):
+    from analyses import get_analysis
+
+    context = get_key_context(key_bytes)
+    inputs = [(text, encrypt_with_context(text, context, trace=False)[0]) for text in _random_texts(payload_size, count)]
+    analysis = get_analysis('advanced_tests')
+    # Serially, so the tests run on the profiled thread instead of the pool's
+    return lambda index: analysis.run(inputs[index][0], key_bytes, inputs[index][1], parallel=False)
+
+
+# Workloads named after the route whose work they repeat. A builder prepares count distinct
+# random payloads, never seen before by the block memo, and returns run(index).
+WORKLOADS = {
+    'encrypt': _encrypt_workload,
+    'decrypt': _decrypt_workload,
+    'rounds': _rounds_workload,
+    'advanced_test_encryption': _advanced_tests_workload,
+}
+
+# Most characters one profile may generate (payload_size * (repetitions + 1)). The payloads are
+# built and prepared while holding the profiler, and rounds runs the traced reference implementation
+WORKLOAD_MAX_CHARS = {
+    'encrypt': 1_000_000,
+    'decrypt': 1_000_000,
+    'rounds': 32_000,
+    'advanced_test_encryption': 256_000,
+}
+
+
+def _function_label(function):
+    filename, line, name = function
+    if filename == '~':
+        return name  # Built-in
+    return f"{os.path.basename(filename)}:{line}({name})"
+
+
+def _collapse_cprofile(stats):
+    """
+    Collapsed stacks from cProfile's caller/callee table.
+
+    cProfile only records edges, so paths are rebuilt top-down from the functions without
+    callers. A function's time along a path is its share of the edge time from its caller,
+    which is exact for call trees and an approximation when a function has several callers.
+    """
+    table = stats.stats
+    callees = {}
+    for function, (_, _, _, _, callers) in table.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((function, edge[3]))
+
+    stacks = Counter()
+
+    def walk(function, path, cumulative):
+        _, _, total_time, cumulative_time, _ = table[function]
+        share = cumulative / cumulative_time if cumulative_time else 0.0
+        path = path + [_function_label(function)]
+        self_us = int(total_time * share * 1e6)
+        if self_us:
+            stacks[';'.join(path)] += self_us
+        if len(path) >= MAX_STACK_DEPTH:
+            return
+        for callee, edge_cumulative in callees.get(function, ()):
+            if _function_label(callee) not in path and edge_cumulative * share >= 1e-6:
+                walk(callee, path, edge_cumulative * share)
+
+    for function, (_, _, _, cumulative_time, callers) in table.items():
+        if not callers:
+            walk(function, [], cumulative_time)
+    return stacks
+
+
+def _top_cprofile(stats, top):
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:top]
+    return [
+        {
+            'function': _function_label(function),
+            'calls': calls,
+            'total_s': total_time,
+            'cumulative_s': cumulative_time,
+        }
+        for function, (_, calls, total_time, cumulative_time, _) in rows
+    ]
+
+
+def _run_cprofile(run, repetitions, top):
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        for index in range(1, repetitions + 1):
+            run(index)
+    finally:
+        profiler.disable()
+    stats = pstats.Stats(profiler)
+    return _collapse_cprofile(stats), _top_cprofile(stats, top), 'microseconds'
+
+
+def _frame_stack(frame):
+    stack = []
+    while frame is not None and len(stack) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        stack.append(f"{os.path.basename(code.co_filename)}:{frame.f_lineno}({code.co_name})")
+        frame = frame.f_back
+    return ';'.join(reversed(stack))
+
+
+def _run_sampling(run, repetitions, top, interval):
+    """
+    Run the workload in its own thread and sample that thread's Python stack every interval
+    seconds through sys._current_frames. Threads the workload starts itself are not sampled.
+    """
+    stacks = Counter()
+    done = threading.Event()
+    errors = []
+
+    def target():
+        try:
+            for index in range(1, repetitions + 1):
+                run(index)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            done.set()
+
+    worker = threading.Thread(target=target, name='profile-workload')
+    worker.start()
+    while not done.wait(interval):
+        frame = sys._current_frames().get(worker.ident)
+        if frame is not None:
+            stacks[_frame_stack(frame)] += 1
+    worker.join()
+    if errors:
+        raise errors[0]
+
+    # Without line numbers, every function counts once per sample it appears in
+    cumulative, own = Counter(), Counter()
+    for stack, count in stacks.items():
+        functions = [frame.split(':', 1)[0] + ':' + frame.split('(', 1)[1][:-1] for frame in stack.split(';')]
+        for function in set(functions):
+            cumulative[function] += count
+        own[functions[-1]] += count
+    total = sum(stacks.values()) or 1
+    top_rows = [
+        {
+            'function': function,
+            'samples': count,
+            'self_samples': own[function],
+            'cumulative_fraction': count / total,
+        }
+        for function, count in cumulative.most_common(top)
+    ]
+    return stacks, top_rows, 'samples'
+
+
+_profile_lock = threading.Lock()
+_last_start = None
+
+
+def profile_workload(workload, key_bytes, payload_size=4096, repetitions=10, mode='cprofile', top=20,
+                     interval=0.001):
+    """
+    Run a workload (see WORKLOADS) on repetitions random texts of payload_size characters
+    and profile it, with cProfile or by sampling stacks every interval seconds.
+
+    Returns the collapsed stacks as text ('frame;frame;frame weight' lines, ready for
+    flamegraph.pl or speedscope) and the top functions by cumulative time or samples.
+    Raises ProfilerBusy while another profile runs or within PROFILE_MIN_INTERVAL of the last.
+    """
+    global _last_start
+    if workload not in WORKLOADS:
+        raise ValueError(f"workload must be one of {', '.join(WORKLOADS)}")
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"mode must be one of {', '.join(PROFILE_MODES)}")
+    if payload_size * (repetitions + 1) > WORKLOAD_MAX_CHARS[workload]:
+        raise ValueError(f"payload_size * (repetitions + 1) is limited to {WORKLOAD_MAX_CHARS[workload]} "
+                         f"characters for {workload}")
+
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusy('Another profile is running')
+    try:
+        now = time.monotonic()
+        if _last_start is not None and now - _last_start < PROFILE_MIN_INTERVAL:
+            raise ProfilerBusy(f'Profiles are limited to one every {PROFILE_MIN_INTERVAL} seconds')
+        _last_start = now
+
+        # Payload 0 warms up lazy imports, key setup and backend autotuning outside the profile
+        run = WORKLOADS[workload](bytes(key_bytes), payload_size, repetitions + 1)
+        run(0)
+        start = time.perf_counter()
+        if mode == 'cprofile':
+            stacks, top_rows, unit = _run_cprofile(run, repetitions, top)
+        else:
+            stacks, top_rows, unit = _run_sampling(run, repetitions, top, interval)
+        elapsed = time.perf_counter() - start
+    finally:
+        _profile_lock.release()
+
+    return {
+        'workload': workload,
+        'mode': mode,
+        'payload_size': payload_size,
+        'repetitions': repetitions,
+        'elapsed_s': elapsed,
+        'unit': unit,
+        'collapsed': '\n'.join(f"{stack} {weight}" for stack, weight in stacks.most_common()),
+        'top': top_rows,
+    }
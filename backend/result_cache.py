@@ -0,0 +1,133 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import zlib
+from collections import OrderedDict
+
+# Approximate memory of one entry besides its key and value (OrderedDict node, bytes headers)
+ENTRY_OVERHEAD = 160
+
+DEFAULT_BUDGETS = {
+    'results': 64 * 1024 * 1024,
+    'blocks': 8 * 1024 * 1024,
+}
+
+
+class ByteBudgetCache:
+    """
+    LRU cache of bytes values bounded by the total size of its entries rather than their number.
+
+    Keys and values are bytes, and an entry costs len(key) + len(value) + ENTRY_OVERHEAD.
+    Inserting evicts least recently used entries until the cache fits its budget again, and a
+    value larger than the whole budget is not stored. A budget of 0 disables the cache.
+    """
+
+    def __init__(self, name, max_bytes):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        cost = len(key) + len(value) + ENTRY_OVERHEAD
+        if cost > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(key) + len(previous) + ENTRY_OVERHEAD
+            while self.size + cost > self.max_bytes:
+                old_key, old_value = self._entries.popitem(last=False)
+                self.size -= len(old_key) + len(old_value) + ENTRY_OVERHEAD
+                self.evictions += 1
+            self._entries[key] = value
+            self.size += cost
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+            }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+def _budget(name):
+    variable = f'{name.upper()}_CACHE_BYTES'
+    default = DEFAULT_BUDGETS.get(name, 0)
+    value = os.environ.get(variable)
+    if value is None:
+        return default
+    try:
+        budget = int(value)
+    except ValueError:
+        budget = -1
+    if budget < 0:
+        logger.error("%s must be a number of bytes (0 disables the cache), not %r; using %d", variable, value, default)
+        return default
+    return budget
+
+
+def get_cache(name):
+    """The named process-wide cache; its budget comes from <NAME>_CACHE_BYTES."""
+    with _caches_lock:
+        if name not in _caches:
+            _caches[name] = ByteBudgetCache(name, _budget(name))
+        return _caches[name]
+
+
+def cache_stats():
+    for name in DEFAULT_BUDGETS:
+        get_cache(name)
+    with _caches_lock:
+        caches = list(_caches.values())
+    return {cache.name: cache.stats() for cache in caches}
+
+
+def cache_key(*parts):
+    """A 32-byte key hashing JSON-serialisable parts, e.g. a route name, key id, input and options."""
+    return hashlib.sha256(json.dumps(parts, separators=(',', ':')).encode('utf-8', 'surrogatepass')).digest()
+
+
+def pack_json(value):
+    return zlib.compress(json.dumps(value, separators=(',', ':')).encode('utf-8'))
+
+
+def unpack_json(blob):
+    return json.loads(zlib.decompress(blob))
@@ -0,0 +1,139 @@
+import hashlib
+import secrets
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from batch_engine import POPCOUNT
+from sbox import generate_key_dependent_sbox
+
+# Limits used to flag weak S-Boxes. Random 8-bit permutations typically have a
+# differential uniformity of 10-14, a nonlinearity of 88-96 and 0-5 fixed points.
+WEAK_SBOX_THRESHOLDS = {
+    'max_differential_uniformity': 16,
+    'min_nonlinearity': 84,
+    'max_fixed_points': 8,
+}
+
+# Only the scalar profile is cached (a few KB); the 256x256 tables are recomputed on request
+_CACHE_SIZE = 256
+_profile_cache = OrderedDict()
+_profile_cache_lock = threading.Lock()
+
+
+def difference_distribution_table(sbox):
+    """DDT[dx][dy] = number of x with S(x) ^ S(x ^ dx) == dy."""
+    sbox = np.asarray(sbox, dtype=np.int64)
+    x = np.arange(256)
+    dy = sbox[x[None, :] ^ x[:, None]] ^ sbox[None, :]
+    return np.bincount((x[:, None] * 256 + dy).ravel(), minlength=256 * 256).reshape(256, 256)
+
+
+def walsh_spectrum(sbox):
+    """
+    W[b][a] = sum over x of (-1)^(a.x ^ b.S(x)), computed with a fast Walsh-Hadamard
+    transform of all 256 component functions at once.
+    """
+    sbox = np.asarray(sbox, dtype=np.int64)
+    x = np.arange(256)
+    spectrum = 1 - 2 * (POPCOUNT[x[:, None] & sbox[None, :]] & 1).astype(np.int64)
+
+    half = 1
+    while half < 256:
+        spectrum = spectrum.reshape(256, -1, 2, half)
+        low, high = spectrum[:, :, 0, :], spectrum[:, :, 1, :]
+        spectrum = np.stack([low + high, low - high], axis=2).reshape(256, 256)
+        half *= 2
+    return spectrum
+
+
+def linear_approximation_table(sbox):
+    """LAT[a][b] = number of x with a.x == b.S(x), minus 128."""
+    return walsh_spectrum(sbox).T // 2
+
+
+def cycle_structure(sbox):
+    """Lengths of the cycles of the S-Box permutation, longest first."""
+    visited = [False] * 256
+    cycles = []
+    for start in range(256):
+        length = 0
+        x = start
+        while not visited[x]:
+            visited[x] = True
+            x = sbox[x]
+            length += 1
+        if length:
+            cycles.append(length)
+    return sorted(cycles, reverse=True)
+
+
+def _compute_profile(sbox):
+    ddt = difference_distribution_table(sbox)
+    spectrum = walsh_spectrum(sbox)
+    # Row 0 of the DDT and of the spectrum (zero difference / zero output mask) are trivial
+    linearity = int(np.abs(spectrum[1:]).max())
+    cycles = cycle_structure(sbox)
+    return {
+        'differential_uniformity': int(ddt[1:].max()),
+        'linearity': linearity,
+        'nonlinearity': 128 - linearity // 2,
+        'max_linear_bias': linearity / 512,
+        'fixed_points': [x for x in range(256) if sbox[x] == x],
+        'cycles': {
+            'count': len(cycles),
+            'longest': cycles[0],
+            'lengths': cycles,
+        },
+    }
+
+
+def sbox_profile(sbox, include_tables=False):
+    """
+    Cryptanalytic profile of an S-Box: differential uniformity, linearity and nonlinearity,
+    fixed points and cycle structure. Profiles are cached by the hash of the S-Box.
+    With include_tables the DDT and LAT are computed again and returned as nested lists.
+    """
+    sbox = [int(value) for value in sbox]
+    if sorted(sbox) != list(range(256)):
+        raise ValueError("S-Box must be a permutation of 0-255")
+
+    sbox_hash = hashlib.sha256(bytes(sbox)).hexdigest()
+    with _profile_cache_lock:
+        profile = _profile_cache.get(sbox_hash)
+        if profile is not None:
+            _profile_cache.move_to_end(sbox_hash)
+
+    if profile is None:
+        profile = _compute_profile(sbox)
+        with _profile_cache_lock:
+            _profile_cache[sbox_hash] = profile
+            if len(_profile_cache) > _CACHE_SIZE:
+                _profile_cache.popitem(last=False)
+
+    result = dict(profile)
+    result['sbox_hash'] = sbox_hash
+    result['weak'] = is_weak_sbox(profile)
+    if include_tables:
+        result['ddt'] = difference_distribution_table(sbox).tolist()
+        result['lat'] = linear_approximation_table(sbox).tolist()
+    return result
+
+
+def is_weak_sbox(profile, thresholds=None):
+    """Check a profile against WEAK_SBOX_THRESHOLDS (or the given thresholds)."""
+    thresholds = {**WEAK_SBOX_THRESHOLDS, **(thresholds or {})}
+    return (profile['differential_uniformity'] > thresholds['max_differential_uniformity']
+            or profile['nonlinearity'] < thresholds['min_nonlinearity']
+            or len(profile['fixed_points']) > thresholds['max_fixed_points'])
+
+
+def generate_screened_key(max_attempts=16, thresholds=None):
+    """Generate a random 256-bit key whose key-dependent S-Box is not weak."""
+    for _ in range(max_attempts):
+        key_bytes = secrets.token_bytes(32)
+        sbox, _ = generate_key_dependent_sbox(key_bytes)
+        if not is_weak_sbox(sbox_profile(sbox), thresholds):
+            return key_bytes
+    raise ValueError(f"No key with a strong S-Box found in {max_attempts} attempts")
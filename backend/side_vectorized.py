@@ -0,0 +1,123 @@
+import time
+
+import numpy as np
+
+# Number of set bits of every byte value
+POPCOUNT = np.array([bin(x).count('1') for x in range(256)], dtype=np.uint8)
+
+METRICS = ("timing_data", "power_data", "cache_timing_data", "branch_timing_data")
+
+
+def _code_points(text):
+    return np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+
+
+def custom_encrypt(plaintext, key, rng=None, chunk_size=1 << 16):
+    """
+    NumPy version of side.custom_encrypt, vectorised over the plaintext.
+
+    The noise of every channel is drawn from rng (a numpy Generator), so results are
+    reproducible for a seeded generator. Timings are measured per chunk of chunk_size
+    characters and spread evenly over its characters. Average/min/max of every metric are
+    accumulated in the same pass over the chunks and returned under "statistics".
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    codes = _code_points(plaintext)
+    key_codes = _code_points(key)
+    n = codes.size
+
+    intermediate = np.empty(n, dtype=np.uint8)
+    fault_injection_data = np.empty(n, dtype=np.uint8)
+    data = {metric: np.empty(n) for metric in METRICS}
+    statistics = {metric: {"sum": 0.0, "max": -np.inf, "min": np.inf} for metric in METRICS}
+
+    for start in range(0, n, chunk_size):
+        end = min(start + chunk_size, n)
+        size = end - start
+
+        # Simulate encryption process
+        chunk_start = time.perf_counter()
+        key_chars = key_codes[np.arange(start, end) % key_codes.size]
+        values = ((codes[start:end] + key_chars) % 256).astype(np.uint8)
+        data["timing_data"][start:end] = (time.perf_counter() - chunk_start) / size
+        intermediate[start:end] = values
+        even = values % 2 == 0
+
+        # Power consumption analysis (simulate Hamming weight + noise)
+        data["power_data"][start:end] = POPCOUNT[values] + rng.uniform(0, 0.5, size)
+
+        # Cache timing analysis
+        data["cache_timing_data"][start:end] = np.where(
+            even, rng.uniform(0.01, 0.05, size), rng.uniform(0.05, 0.1, size)
+        )
+
+        # Branch prediction analysis
+        branch_start = time.perf_counter()
+        wide_values = values.astype(np.int64)
+        np.where(even, wide_values * 2, wide_values // 2)
+        data["branch_timing_data"][start:end] = (time.perf_counter() - branch_start) / size
+
+        # Fault injection analysis (simulate bit-flipping)
+        fault_injection_data[start:end] = values ^ (1 << rng.integers(0, 8, size)).astype(np.uint8)
+
+        # Statistics are updated while the chunk is still in cache
+        for metric in METRICS:
+            chunk = data[metric][start:end]
+            statistics[metric]["sum"] += chunk.sum()
+            statistics[metric]["max"] = max(statistics[metric]["max"], chunk.max())
+            statistics[metric]["min"] = min(statistics[metric]["min"], chunk.min())
+
+    return {
+        "ciphertext": intermediate.tobytes().decode('latin1'),
+        **data,
+        "fault_injection_data": fault_injection_data,
+        "statistics": {
+            metric: {
+                "average": float(stats["sum"] / n) if n else 0.0,
+                "max": float(stats["max"]) if n else 0.0,
+                "min": float(stats["min"]) if n else 0.0,
+            }
+            for metric, stats in statistics.items()
+        },
+    }
+
+
+def calculate_entropy(data):
+    """
+    Calculate the Shannon entropy of an array of byte values.
+    """
+    if data.size == 0:
+        return 0.0
+    counts = np.bincount(data, minlength=256)
+    probabilities = counts[counts > 0] / data.size
+    return float(-np.sum(probabilities * np.log2(probabilities)))
+
+
+def side_channel_analysis(plaintext, key, seed=None):
+    """
+    Perform side-channel analysis on the custom encryption algorithm, like side.side_channel_analysis.
+    """
+    result = custom_encrypt(plaintext, key, np.random.default_rng(seed))
+
+    analysis_results = dict(result["statistics"])
+    analysis_results["fault_injection_data"] = {
+        "entropy": calculate_entropy(result["fault_injection_data"]),
+    }
+
+    return result, analysis_results
+
+
+# Main program for testing
+if __name__ == "__main__":
+    plaintext = "HELLO" * 200_000
+    key = "SECRETKEY"
+
+    start = time.perf_counter()
+    encrypted_data, analysis = side_channel_analysis(plaintext, key, seed=0)
+    print(f"Analysed {len(plaintext)} characters in {time.perf_counter() - start:.3f} s")
+
+    print("\n=== Side-Channel Analysis ===")
+    for metric, stats in analysis.items():
+        print(f"\n{metric.capitalize()}:")
+        for stat, value in stats.items():
+            print(f"  {stat.capitalize()}: {value}")
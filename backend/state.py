@@ -0,0 +1,192 @@
+from galois import galois_mult
+
+# A flat state holds state[row][col] at index row * 4 + col
+
+
+def _cycles(gather):
+    """
+    Split the permutation new[i] = old[gather[i]] into cycles (first, moves, last) that _permute
+    walks in place: first is saved, every (target, source) move copies one byte along the cycle
+    and last takes the saved byte.
+    """
+    cycles = []
+    seen = set()
+    for start in range(len(gather)):
+        if start in seen or gather[start] == start:
+            continue
+        cycle = [start]
+        while gather[cycle[-1]] != start:
+            cycle.append(gather[cycle[-1]])
+        seen.update(cycle)
+        cycles.append((start, tuple(zip(cycle, cycle[1:])), cycle[-1]))
+    return tuple(cycles)
+
+
+def _permute(data, cycles):
+    for first, moves, last in cycles:
+        saved = data[first]
+        for target, source in moves:
+            data[target] = data[source]
+        data[last] = saved
+
+
+def _translate(data, table):
+    for index in range(16):
+        data[index] = table[data[index]]
+
+
+# ShiftRows: new[row][col] = old[row][(col + row) % 4]
+SHIFT_ROWS = _cycles([row * 4 + (col + row) % 4 for row in range(4) for col in range(4)])
+INVERSE_SHIFT_ROWS = _cycles([row * 4 + (col - row) % 4 for row in range(4) for col in range(4)])
+
+# Blocks are column-major (matrix[row][col] = block[col * 4 + row]); the same permutation works both ways
+TRANSPOSE = _cycles([col * 4 + row for row in range(4) for col in range(4)])
+
+# Byte translation tables
+SHIFT_RIGHT_2 = bytes(x >> 2 for x in range(256))
+SHIFT_LEFT_2 = bytes((x << 2) & 0xFF for x in range(256))
+MUL2 = bytes(galois_mult(x, 2) for x in range(256))
+MUL3 = bytes(galois_mult(x, 3) for x in range(256))
+MUL9 = bytes(galois_mult(x, 9) for x in range(256))
+MUL11 = bytes(galois_mult(x, 11) for x in range(256))
+MUL13 = bytes(galois_mult(x, 13) for x in range(256))
+MUL14 = bytes(galois_mult(x, 14) for x in range(256))
+
+
+def flatten_round_keys(round_keys):
+    """Round keys as 15 ints, each holding the 16 bytes of a round key in flat state order (big-endian)."""
+    return tuple(int.from_bytes(bytes(byte for row in round_key for byte in row), 'big')
+                 for round_key in round_keys)
+
+
+class BlockState:
+    """
+    The 4x4 cipher state as one bytearray(16) in row-major order.
+
+    Every stage mutates the bytearray in place and builds no new buffer: SubBytes and the
+    bitshift layer go through byte tables, ShiftRows and the transposes walk the cycles of a
+    precomputed permutation and AddRoundKey XORs a 16-byte round key byte by byte. One state
+    can be reused for every block of a message.
+    """
+
+    __slots__ = ('data',)
+
+    def __init__(self, data=bytes(16)):
+        self.data = bytearray(data)
+
+    @classmethod
+    def from_matrix(cls, matrix):
+        return cls(bytes(cell for row in matrix for cell in row))
+
+    def to_matrix(self):
+        return [list(self.data[row * 4:row * 4 + 4]) for row in range(4)]
+
+    def load_plaintext(self, block):
+        # Bitshift layer and transpose: state[row][col] = block[row * 4 + col] >> 2
+        self.data[:] = block
+        _translate(self.data, SHIFT_RIGHT_2)
+
+    def load_ciphertext(self, block):
+        self.data[:] = block
+        _permute(self.data, TRANSPOSE)
+
+    def transpose(self):
+        """Switch between the row-major state and the column-major block order of the ciphertext."""
+        _permute(self.data, TRANSPOSE)
+
+    def add_round_key(self, round_key):
+        d = self.data
+        for index in range(16):
+            d[index] ^= round_key[index]
+
+    def sub_bytes(self, sbox_table):
+        _translate(self.data, sbox_table)
+
+    def shift_rows(self):
+        _permute(self.data, SHIFT_ROWS)
+
+    def inverse_shift_rows(self):
+        _permute(self.data, INVERSE_SHIFT_ROWS)
+
+    def mix_columns(self):
+        d = self.data
+        for col in range(4):
+            a0, a1, a2, a3 = d[col], d[4 + col], d[8 + col], d[12 + col]
+            d[col] = MUL2[a0] ^ MUL3[a1] ^ a2 ^ a3
+            d[4 + col] = a0 ^ MUL2[a1] ^ MUL3[a2] ^ a3
+            d[8 + col] = a0 ^ a1 ^ MUL2[a2] ^ MUL3[a3]
+            d[12 + col] = MUL3[a0] ^ a1 ^ a2 ^ MUL2[a3]
+
+    def inverse_mix_columns(self):
+        d = self.data
+        for col in range(4):
+            a0, a1, a2, a3 = d[col], d[4 + col], d[8 + col], d[12 + col]
+            d[col] = MUL14[a0] ^ MUL11[a1] ^ MUL13[a2] ^ MUL9[a3]
+            d[4 + col] = MUL9[a0] ^ MUL14[a1] ^ MUL11[a2] ^ MUL13[a3]
+            d[8 + col] = MUL13[a0] ^ MUL9[a1] ^ MUL14[a2] ^ MUL11[a3]
+            d[12 + col] = MUL11[a0] ^ MUL13[a1] ^ MUL9[a2] ^ MUL14[a3]
+
+    def restore_plaintext(self, bitshift_bits):
+        """Transpose and inverse bitshift layer: block[i] = state[i] << 2 | bits, bits in text order."""
+        d = self.data
+        for index in range(16):
+            d[index] = SHIFT_LEFT_2[d[index]] | bitshift_bits[index]
+
+
+def round_key_bytes(flat_round_keys):
+    """The flat round keys of a KeyContext as the 16-byte keys BlockState.add_round_key takes."""
+    return [round_key.to_bytes(16, 'big') for round_key in flat_round_keys]
+
+
+def encrypt_state(state, round_keys, sbox_table):
+    """Encrypt a state loaded with load_plaintext, in place, with round keys from round_key_bytes."""
+    state.add_round_key(round_keys[0])
+    for round in range(1, 14):
+        state.sub_bytes(sbox_table)
+        state.shift_rows()
+        state.mix_columns()
+        state.add_round_key(round_keys[round])
+    state.sub_bytes(sbox_table)
+    state.shift_rows()
+    state.add_round_key(round_keys[14])
+
+
+def decrypt_state(state, round_keys, inverse_sbox_table):
+    """Decrypt a state loaded with load_ciphertext, in place, up to the inverse bitshift layer."""
+    state.add_round_key(round_keys[14])
+    for round in range(13, 0, -1):
+        state.inverse_shift_rows()
+        state.sub_bytes(inverse_sbox_table)
+        state.add_round_key(round_keys[round])
+        state.inverse_mix_columns()
+    state.inverse_shift_rows()
+    state.sub_bytes(inverse_sbox_table)
+    state.add_round_key(round_keys[0])
+
+
+def encrypt_bytes(data, context):
+    """Cipher backend entry point: encrypt padded bytes with a KeyContext, returning the ciphertext bytes."""
+    sbox_table = bytes(context.sbox)
+    round_keys = round_key_bytes(context.flat_round_keys)
+    state = BlockState()
+    ciphertext = bytearray()
+    for start in range(0, len(data), 16):
+        state.load_plaintext(data[start:start + 16])
+        encrypt_state(state, round_keys, sbox_table)
+        state.transpose()
+        ciphertext += state.data
+    return bytes(ciphertext)
+
+
+def decrypt_bytes(data, bitshift_bits, context):
+    """Cipher backend entry point: decrypt ciphertext bytes given their bitshift bits in text order."""
+    inverse_sbox_table = bytes(context.inverse_sbox)
+    round_keys = round_key_bytes(context.flat_round_keys)
+    state = BlockState()
+    plaintext = bytearray()
+    for start in range(0, len(data), 16):
+        state.load_ciphertext(data[start:start + 16])
+        decrypt_state(state, round_keys, inverse_sbox_table)
+        state.restore_plaintext(bitshift_bits[start:start + 16])
+        plaintext += state.data
+    return bytes(plaintext)
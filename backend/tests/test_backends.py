@@ -0,0 +1,62 @@
+import hashlib
+import random
+
+import pytest
+
+from backends import REFERENCE, get_backend, list_backends, self_check
+from encryption import encrypt_with_context, get_key_context
+from result_cache import get_cache
+
+
+def _random_bytes(rng, size):
+    return bytes(rng.getrandbits(8) for _ in range(size))
+
+
+@pytest.fixture(scope='module')
+def context():
+    return get_key_context(_random_bytes(random.Random(1), 32))
+
+
+@pytest.mark.parametrize('name', [backend.name for backend in list_backends()])
+@pytest.mark.parametrize('num_blocks', [1, 3, 17, 64])
+def test_backend_matches_reference(name, num_blocks, context):
+    backend = get_backend(name)
+    if not backend.available():
+        pytest.skip(f"requires {', '.join(backend.missing())}")
+
+    rng = random.Random(num_blocks)
+    data = _random_bytes(rng, 16 * num_blocks)
+    ciphertext = backend.encrypt_bytes(data, context)
+
+    assert ciphertext == get_backend(REFERENCE).encrypt_bytes(data, context)
+    assert backend.decrypt_bytes(ciphertext, bytes(byte & 0b11 for byte in data), context) == data
+
+
+def test_reference_known_answer():
+    # Ciphertext of the nested-list reference from before its stages became BlockState adapters
+    context = get_key_context(bytes(range(32)))
+    ciphertext = get_backend(REFERENCE).encrypt_bytes(bytes(range(256)), context)
+    assert ciphertext[:16].hex() == '8650044b80c50bda321831a16fd78244'
+    assert hashlib.sha256(ciphertext).hexdigest() == (
+        '65d69910bb4a90f4c85a62934ea9d7bf3a0dcded2ce06a07f7ae406e5dd78bb8')
+
+
+@pytest.mark.parametrize('name', [backend.name for backend in list_backends()])
+def test_self_check(name):
+    backend = get_backend(name)
+    if not backend.available():
+        pytest.skip(f"requires {', '.join(backend.missing())}")
+    assert self_check(backend)
+
+
+@pytest.mark.parametrize('name', [backend.name for backend in list_backends()])
+def test_untraced_encrypt_matches_traced(name, context):
+    backend = get_backend(name)
+    if not backend.available():
+        pytest.skip(f"requires {', '.join(backend.missing())}")
+
+    text = ''.join(chr(value) for value in range(256)) + 'tail'
+    get_cache('blocks').clear()  # Otherwise the block memo answers for every backend after the first
+    traced = encrypt_with_context(text, context, trace=True)
+    untraced = encrypt_with_context(text, context, trace=False, backend=name)
+    assert untraced[:2] == traced[:2]
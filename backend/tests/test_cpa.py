@@ -0,0 +1,50 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from cpa import KEY_BYTE_OF_POSITION, CpaAccumulator, cpa_attack, hypothesis_table, simulate_traces
+from encryption import get_key_context
+
+KEY = bytes(range(7, 7 + 32))
+
+
+@pytest.mark.parametrize('leakage_model', ['hw', 'hd', 'both'])
+def test_recovers_the_first_round_key(leakage_model):
+    result = cpa_attack(KEY, num_traces=5000, leakage_model=leakage_model, noise_std=1.0, seed=0)
+
+    assert [entry['recovered'] for entry in result['bytes']] == [KEY[index] for index in KEY_BYTE_OF_POSITION]
+    assert result['rank_curve'][-1]['recovered_bytes'] == 16
+    assert result['traces_to_recover'] is not None and result['traces_to_recover'] <= 5000
+
+
+def test_noisy_traces_need_more_traces():
+    quiet = cpa_attack(KEY, num_traces=20000, noise_std=0.5, seed=1)['traces_to_recover']
+    noisy = cpa_attack(KEY, num_traces=20000, noise_std=4.0, seed=1)['traces_to_recover']
+    assert quiet is not None and noisy is not None
+    assert quiet < noisy
+
+
+def test_accumulated_correlations_match_direct_computation():
+    plaintexts, traces = simulate_traces(KEY, 3000, noise_std=1.0, seed=2)
+    sbox = get_key_context(KEY).sbox
+    hypotheses = hypothesis_table(sbox)
+
+    accumulator = CpaAccumulator(16)
+    # Chunked accumulation equals one pass over all traces
+    accumulator.add(plaintexts[:1000], traces[:1000])
+    accumulator.add(plaintexts[1000:], traces[1000:])
+    correlations = accumulator.correlations(hypotheses)
+
+    for position in (0, 5, 15):
+        for guess in (0, KEY[KEY_BYTE_OF_POSITION[position]], 255):
+            predictions = hypotheses[plaintexts[:, position] >> 2, guess]
+            expected = np.corrcoef(predictions, traces[:, position].astype(np.float64))[0, 1]
+            assert correlations[position, guess, position] == pytest.approx(expected, abs=1e-9)
+
+
+def test_simulated_traces_shape():
+    plaintexts, traces = simulate_traces(KEY, 100, leakage_model='both', seed=3)
+    assert plaintexts.shape == (100, 16)
+    assert traces.shape == (100, 32) and traces.dtype == np.float32
+    with pytest.raises(ValueError):
+        simulate_traces(KEY, 10, leakage_model='unknown')
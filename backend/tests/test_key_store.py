@@ -0,0 +1,78 @@
+import os
+import stat
+
+import pytest
+
+from encryption import get_key_context
+from key_store import HEADER, CorruptKeyring, KeyStore, UnknownKey
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'keyring.bin')
+
+
+def test_round_trip(path):
+    store = KeyStore(path)
+    key_bytes = bytes(range(32))
+    key_id = store.add_key(key_bytes)
+
+    assert key_id in store
+    assert store.get_key(key_id) == key_bytes
+    assert store.get_context(key_id) == get_key_context(key_bytes)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+
+def test_keys_are_found_by_another_store(path):
+    writer = KeyStore(path)
+    first = writer.add_key()
+    reader = KeyStore(path)
+    assert reader.key_ids() == [first]
+
+    # Keys appended after the reader mapped the file are found on the next lookup
+    second = writer.add_key(bytes(32))
+    assert reader.get_key(second) == bytes(32)
+    assert reader.key_ids() == [first, second]
+
+
+def test_default_key_is_written_once(path):
+    store = KeyStore(path)
+    default = store.default_key_id(lambda: bytes(range(32)))
+    assert store.get_key(default) == bytes(range(32))
+
+    other = KeyStore(path)
+    assert other.default_key_id(lambda: bytes(32)) == default
+    assert other.key_ids() == [default]
+
+
+@pytest.mark.parametrize('key_id', ['00' * 16, 'not hex', '00', None])
+def test_unknown_key(path, key_id):
+    store = KeyStore(path)
+    store.add_key()
+    with pytest.raises(UnknownKey):
+        store.get_context(key_id)
+    assert key_id not in store
+
+
+def test_rejects_bad_key_size(path):
+    with pytest.raises(ValueError):
+        KeyStore(path).add_key(bytes(16))
+
+
+def test_corrupt_record(path):
+    key_id = KeyStore(path).add_key()
+    with open(path, 'r+b') as f:
+        f.seek(HEADER.size + 100)
+        byte = f.read(1)
+        f.seek(HEADER.size + 100)
+        f.write(bytes([byte[0] ^ 0xFF]))
+
+    with pytest.raises(CorruptKeyring):
+        KeyStore(path).get_context(key_id)
+
+
+def test_wrong_header(path):
+    with open(path, 'wb') as f:
+        f.write(b'XXXX' + bytes(HEADER.size - 4))
+    with pytest.raises(CorruptKeyring):
+        KeyStore(path).key_ids()
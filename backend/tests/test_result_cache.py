@@ -0,0 +1,75 @@
+import pytest
+
+from result_cache import ENTRY_OVERHEAD, ByteBudgetCache, _budget, pack_json, unpack_json
+
+
+def _cost(key, value):
+    return len(key) + len(value) + ENTRY_OVERHEAD
+
+
+def test_evicts_least_recently_used():
+    cache = ByteBudgetCache('test', 3 * _cost(b'k0', b'v' * 100))
+    for index in range(3):
+        cache.put(b'k%d' % index, b'v' * 100)
+    cache.get(b'k0')  # k1 is now the least recently used
+    cache.put(b'k3', b'v' * 100)
+
+    assert cache.get(b'k1') is None
+    assert all(cache.get(key) is not None for key in (b'k0', b'k2', b'k3'))
+    assert cache.stats()['evictions'] == 1
+    assert cache.size == 3 * _cost(b'k0', b'v' * 100)
+
+
+def test_large_value_evicts_several_entries():
+    cache = ByteBudgetCache('test', 4 * _cost(b'k0', b'v' * 10))
+    for index in range(4):
+        cache.put(b'k%d' % index, b'v' * 10)
+    cache.put(b'big', b'v' * (2 * _cost(b'k0', b'v' * 10) - ENTRY_OVERHEAD - 3))
+
+    assert cache.stats()['evictions'] == 2
+    assert cache.get(b'k0') is None and cache.get(b'k1') is None
+    assert cache.size <= cache.max_bytes
+
+
+def test_replacing_a_key_keeps_the_size_exact():
+    cache = ByteBudgetCache('test', 10_000)
+    cache.put(b'key', b'a' * 100)
+    cache.put(b'key', b'b' * 50)
+    assert cache.get(b'key') == b'b' * 50
+    assert cache.size == _cost(b'key', b'b' * 50)
+
+
+def test_value_larger_than_the_budget_is_not_stored():
+    cache = ByteBudgetCache('test', 1000)
+    cache.put(b'small', b'x')
+    cache.put(b'huge', b'x' * 1000)
+    assert cache.get(b'huge') is None
+    assert cache.get(b'small') == b'x'
+
+
+def test_zero_budget_disables_the_cache():
+    cache = ByteBudgetCache('test', 0)
+    cache.put(b'key', b'value')
+    assert not cache.enabled
+    assert cache.get(b'key') is None
+
+
+def test_stats_count_hits_and_misses():
+    cache = ByteBudgetCache('test', 10_000)
+    cache.put(b'key', b'value')
+    cache.get(b'key')
+    cache.get(b'other')
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['hit_rate']) == (1, 1, 0.5)
+
+
+@pytest.mark.parametrize('value, expected', [('1024', 1024), ('0', 0), ('abc', 64 * 1024 * 1024),
+                                             ('-1', 64 * 1024 * 1024)])
+def test_budget_from_environment(monkeypatch, value, expected):
+    monkeypatch.setenv('RESULTS_CACHE_BYTES', value)
+    assert _budget('results') == expected
+
+
+def test_pack_json_round_trip():
+    value = {'results': [1, 2.5, 'x'], 'nested': {'a': None}}
+    assert unpack_json(pack_json(value)) == value
@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from sbox import generate_key_dependent_sbox
+from sbox_analysis import difference_distribution_table, linear_approximation_table, sbox_profile
+
+
+def _parity(value):
+    return bin(value).count('1') & 1
+
+
+@pytest.fixture(scope='module')
+def sbox():
+    return generate_key_dependent_sbox(bytes(range(32)))[0]
+
+
+@pytest.fixture(scope='module')
+def brute_force_ddt(sbox):
+    ddt = [[0] * 256 for _ in range(256)]
+    for dx in range(256):
+        for x in range(256):
+            ddt[dx][sbox[x] ^ sbox[x ^ dx]] += 1
+    return ddt
+
+
+@pytest.fixture(scope='module')
+def brute_force_lat(sbox):
+    # LAT[a][b] = #{x : a.x == b.S(x)} - 128, counted from the parity bits of every mask and input
+    input_parity = np.array([[_parity(a & x) for x in range(256)] for a in range(256)])
+    output_parity = np.array([[_parity(b & sbox[x]) for x in range(256)] for b in range(256)])
+    agree = input_parity @ output_parity.T + (1 - input_parity) @ (1 - output_parity).T
+    return (agree - 128).tolist()
+
+
+def test_ddt_matches_brute_force(sbox, brute_force_ddt):
+    assert difference_distribution_table(sbox).tolist() == brute_force_ddt
+
+
+def test_lat_matches_brute_force(sbox, brute_force_lat):
+    lat = linear_approximation_table(sbox).tolist()
+    assert lat == brute_force_lat
+
+    # A few entries counted without NumPy at all
+    rng = random.Random(0)
+    for _ in range(20):
+        a, b = rng.randrange(256), rng.randrange(256)
+        agree = sum(_parity(a & x) == _parity(b & sbox[x]) for x in range(256))
+        assert lat[a][b] == agree - 128
+
+
+def test_profile_matches_tables(sbox, brute_force_ddt, brute_force_lat):
+    profile = sbox_profile(sbox, include_tables=True)
+    # Nonzero output masks b, as in the Walsh spectrum
+    linearity = 2 * max(abs(value) for row in brute_force_lat for value in row[1:])
+
+    assert profile['differential_uniformity'] == max(max(row) for row in brute_force_ddt[1:])
+    assert profile['linearity'] == linearity
+    assert profile['nonlinearity'] == 128 - linearity // 2
+    assert profile['fixed_points'] == [x for x in range(256) if sbox[x] == x]
+    assert sum(profile['cycles']['lengths']) == 256
+    assert profile['ddt'] == brute_force_ddt
+    assert profile['lat'] == brute_force_lat
+
+
+def test_cached_profile_omits_tables(sbox):
+    first = sbox_profile(sbox)
+    second = sbox_profile(sbox)
+    assert first == second
+    assert 'ddt' not in second and 'lat' not in second
+
+
+def test_rejects_non_permutation():
+    with pytest.raises(ValueError):
+        sbox_profile([0] * 256)
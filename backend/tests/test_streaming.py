@@ -0,0 +1,68 @@
+import base64
+import os
+
+import pytest
+
+from backends import REFERENCE, get_backend
+from encryption import (STREAM_RECORD_SIZE, decrypt_stream, encrypt_stream, encrypt_with_context, get_key_context,
+                        pack_bitshift_bits)
+
+
+@pytest.fixture(scope='module')
+def context():
+    return get_key_context(bytes(range(32)))
+
+
+def _chunks(data, size):
+    return [data[start:start + size] for start in range(0, len(data), size)]
+
+
+def _record(block, context):
+    # One stream record for a 16-byte block, padded or not
+    return get_backend(REFERENCE).encrypt_bytes(block, context) + pack_bitshift_bits(block)
+
+
+@pytest.mark.parametrize('size', [0, 1, 15, 16, 17, 1000])
+@pytest.mark.parametrize('chunk_size', [1, 7, 64])
+def test_stream_round_trip(size, chunk_size, context):
+    data = os.urandom(size)
+    records = b''.join(encrypt_stream(_chunks(data, chunk_size), context))
+
+    assert len(records) == (size // 16 + 1) * STREAM_RECORD_SIZE
+    assert b''.join(decrypt_stream(_chunks(records, chunk_size + 3), context)) == data
+
+
+def test_stream_matches_encrypt(context):
+    data = bytes(range(256)) * 3
+    records = b''.join(encrypt_stream([data], context))
+    ciphertext = b''.join(records[start:start + 16] for start in range(0, len(records), STREAM_RECORD_SIZE))
+
+    encrypted_text, _, _ = encrypt_with_context(data.decode('latin1'), context, trace=False)
+    assert ciphertext == base64.b64decode(encrypted_text)
+
+
+@pytest.mark.parametrize('last_block', [
+    b'A' * 15 + b'\x00',          # Pad byte 0
+    b'A' * 15 + b'\x11',          # Pad byte above the block size
+    b'A' * 14 + b'\x01\x02',      # Pad bytes that do not match
+    b'A' * 13 + b'\x03\x04\x03',
+])
+def test_bad_padding_is_rejected(last_block, context):
+    records = _record(b'B' * 16, context) + _record(last_block, context)
+    with pytest.raises(ValueError, match='padding'):
+        b''.join(decrypt_stream([records], context))
+
+
+def test_corrupted_stream_is_rejected(context):
+    records = bytearray(b''.join(encrypt_stream([b'secret message'], context)))
+    records[15] ^= 0xFF
+    with pytest.raises(ValueError, match='padding'):
+        b''.join(decrypt_stream([bytes(records)], context))
+
+
+def test_truncated_and_empty_streams_are_rejected(context):
+    records = b''.join(encrypt_stream([b'x' * 40], context))
+    with pytest.raises(ValueError, match='record boundary'):
+        b''.join(decrypt_stream([records[:-1]], context))
+    with pytest.raises(ValueError, match='no blocks'):
+        b''.join(decrypt_stream([], context))
@@ -0,0 +1,179 @@
+import math
+import multiprocessing
+import os
+import random
+import time
+
+from Cypher import encrypt_block
+from encryption import get_key_context
+from matrix_operations import split_string_to_column_major_matrix
+from utils import pad_text
+
+# |t| above this threshold is the usual TVLA evidence of a leak
+TVLA_THRESHOLD = 4.5
+
+
+class WelchAccumulator:
+    """Online mean and variance of the two classes (Welford), giving Welch's t-statistic at any time."""
+
+    def __init__(self):
+        self.count = [0, 0]
+        self.mean = [0.0, 0.0]
+        self.m2 = [0.0, 0.0]
+
+    def add(self, group, value):
+        self.count[group] += 1
+        delta = value - self.mean[group]
+        self.mean[group] += delta / self.count[group]
+        self.m2[group] += delta * (value - self.mean[group])
+
+    def variance(self, group):
+        return self.m2[group] / (self.count[group] - 1) if self.count[group] > 1 else 0.0
+
+    def t_statistic(self):
+        if min(self.count) < 2:
+            return 0.0
+        standard_error = math.sqrt(self.variance(0) / self.count[0] + self.variance(1) / self.count[1])
+        return (self.mean[0] - self.mean[1]) / standard_error if standard_error else 0.0
+
+
+class Histogram:
+    """Fixed-width histogram of timings in nanoseconds with an overflow bucket."""
+
+    def __init__(self, upper_ns, bins):
+        self.upper_ns = upper_ns
+        self.width = max(1, upper_ns // bins)
+        self.counts = [0] * (bins + 1)
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        self.counts[min(value // self.width, len(self.counts) - 1)] += 1
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+
+def _random_block(rng):
+    return [[rng.randrange(256) for _ in range(4)] for _ in range(4)]
+
+
+def _tvla_worker(connection, *args):
+    # Exceptions go back through the pipe, so the parent can re-raise them with their message
+    try:
+        result = _tvla(*args)
+    except Exception as e:
+        connection.send(('error', f"{type(e).__name__}: {e}"))
+    else:
+        connection.send(('ok', result))
+    connection.close()
+
+
+def _tvla(key_bytes, fixed_text, num_samples, warmup, cpu, bins, max_seconds, seed):
+    if cpu is not None and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, {cpu})
+
+    context = get_key_context(key_bytes)
+    round_keys, sbox = context.round_keys, context.sbox
+    fixed_block = split_string_to_column_major_matrix(pad_text(fixed_text)[:16])[0]
+    rng = random.Random(seed)
+
+    # Warm up caches and the interpreter, and size the histograms from the warm-up timings
+    warmup_timings = []
+    for _ in range(warmup):
+        matrix = fixed_block if rng.random() < 0.5 else _random_block(rng)
+        start = time.perf_counter_ns()
+        encrypt_block(matrix, round_keys, sbox, trace=False)
+        warmup_timings.append(time.perf_counter_ns() - start)
+    warmup_timings.sort()
+    upper_ns = 4 * warmup_timings[len(warmup_timings) // 2] if warmup_timings else 1_000_000
+
+    accumulator = WelchAccumulator()
+    histograms = [Histogram(upper_ns, bins), Histogram(upper_ns, bins)]
+    progress = []
+    checkpoint = max(1, num_samples // 20)
+    deadline = time.monotonic() + max_seconds
+
+    samples = 0
+    while samples < num_samples:
+        # Classes are interleaved randomly so drifts affect both of them alike
+        group = 0 if rng.random() < 0.5 else 1
+        matrix = fixed_block if group == 0 else _random_block(rng)
+
+        start = time.perf_counter_ns()
+        encrypt_block(matrix, round_keys, sbox, trace=False)
+        elapsed = time.perf_counter_ns() - start
+
+        accumulator.add(group, elapsed)
+        histograms[group].add(elapsed)
+        samples += 1
+
+        if samples % checkpoint == 0:
+            progress.append({'samples': samples, 't_statistic': accumulator.t_statistic()})
+            if time.monotonic() > deadline:
+                break
+
+    t_statistic = accumulator.t_statistic()
+    return {
+        'samples': samples,
+        't_statistic': t_statistic,
+        'threshold': TVLA_THRESHOLD,
+        'leak_detected': abs(t_statistic) > TVLA_THRESHOLD,
+        'cpu': cpu,
+        'classes': {
+            name: {
+                'count': accumulator.count[group],
+                'mean_ns': accumulator.mean[group],
+                'std_ns': math.sqrt(accumulator.variance(group)),
+                'min_ns': histograms[group].min,
+                'max_ns': histograms[group].max,
+                'histogram': histograms[group].counts,
+            }
+            for group, name in enumerate(['fixed', 'random'])
+        },
+        'histogram_bin_width_ns': histograms[0].width,
+        'progress': progress,
+    }
+
+
+def timing_leakage_analysis(fixed_text, key_bytes, num_samples=20000, warmup=1000, cpu=None, bins=50,
+                            max_seconds=60, seed=None):
+    """
+    Fixed-vs-random TVLA timing test of the block engine.
+
+    The key context is prepared once, fixed and random plaintext blocks are interleaved randomly
+    and each block encryption is timed with perf_counter_ns after a warm-up. Welch's t-statistic
+    is accumulated online in a dedicated worker process, optionally pinned to one CPU, so
+    millions of samples can be collected without keeping them. Returns summaries, histograms and
+    the t-statistic as the sample count grows. Raises ValueError if cpu is not one of the CPUs
+    this process may run on.
+    """
+    if cpu is not None:
+        allowed = os.sched_getaffinity(0) if hasattr(os, 'sched_getaffinity') else range(os.cpu_count() or 1)
+        if not isinstance(cpu, int) or isinstance(cpu, bool) or cpu not in allowed:
+            raise ValueError(f"cpu must be one of the available CPUs: {', '.join(map(str, sorted(allowed)))}")
+
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    worker = multiprocessing.get_context('spawn').Process(
+        target=_tvla_worker,
+        args=(sender, bytes(key_bytes), fixed_text, num_samples, warmup, cpu, bins, max_seconds, seed),
+        daemon=True,
+    )
+    worker.start()
+    sender.close()
+
+    try:
+        # Leave some time for the worker to start and report after its deadline
+        if not receiver.poll(max_seconds + 30):
+            raise TimeoutError("Timing leakage worker did not finish in time")
+        try:
+            status, result = receiver.recv()
+        except EOFError:
+            worker.join(timeout=1)
+            raise RuntimeError(f"Timing leakage worker exited with code {worker.exitcode}") from None
+        if status == 'error':
+            raise RuntimeError(f"Timing leakage worker failed: {result}")
+        return result
+    finally:
+        worker.join(timeout=1)
+        if worker.is_alive():
+            worker.terminate()
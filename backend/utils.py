@@ -1,3 +1,6 @@
+from state import BlockState
+
+
 def pad_text(text, block_size=16):
     """Apply PKCS#7 padding to the text."""
     pad_len = block_size - (len(text) % block_size)
@@ -29,13 +32,18 @@ def bitshift_layer(matrix, shift_right=True, bitshift_bits_matrix=None):
         return shifted_matrix
 
 
+# add_round_key and apply_sbox are adapters from 4x4 matrices to the in-place BlockState stages
+
 def add_round_key(state, round_key):
-    return [[(state[row][col] ^ round_key[row][col]) % 256 for col in range(len(state[0]))] for row in range(4)]
+    block = BlockState.from_matrix(state)
+    block.add_round_key(BlockState.from_matrix(round_key).data)
+    return block.to_matrix()
+
 
 def apply_sbox(matrix, sbox):
-    for row in range(4):
-        for col in range(len(matrix[0])):
-            matrix[row][col] = sbox[matrix[row][col]]
+    state = BlockState.from_matrix(matrix)
+    state.sub_bytes(sbox)
+    matrix[:] = state.to_matrix()
     return matrix
 
 
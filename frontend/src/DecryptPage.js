@@ -80,7 +80,7 @@ function DecryptPage() {
       axios
         .post('http://localhost:5000/api/decrypt', {
           encrypted_text: encryptedText,
-          key: processedKey,
+          key_id: processedKey,
           bitshift_matrices: parsedMatrices,
         })
         .then((response) => {
@@ -83,6 +83,9 @@ const desiredRanges = {
 function EncryptPage() {
   const [inputText, setInputText] = useState('');
   const [rounds, setRounds] = useState([]);
+  const [roundsBlock, setRoundsBlock] = useState(0);
+  const [totalBlocks, setTotalBlocks] = useState(0);
+  const [encryptedInput, setEncryptedInput] = useState('');
   const [encryptedText, setEncryptedText] = useState('');
   const [encryptionKey, setEncryptionKey] = useState('');
   const [bitshiftMatrices, setBitshiftMatrices] = useState([]);
@@ -100,6 +103,28 @@ function EncryptPage() {
   const [snackbarMessage, setSnackbarMessage] = useState('');
   const [snackbarSeverity, setSnackbarSeverity] = useState('success');
 
+  // Round details are recomputed by the backend for the block being viewed
+  const fetchRounds = (block, text, keyId) => {
+    axios
+      .post('http://localhost:5000/api/rounds', {
+        text,
+        key_id: keyId,
+        start: block,
+        limit: 1,
+      })
+      .then((response) => {
+        setRounds(response.data.rounds);
+        setRoundsBlock(block);
+        setTotalBlocks(response.data.total_blocks);
+      })
+      .catch((error) => {
+        console.error('Fetching rounds failed!', error);
+        setSnackbarMessage('Could not load the encryption rounds.');
+        setSnackbarSeverity('error');
+        setSnackbarOpen(true);
+      });
+  };
+
   // Handlers
   const handleEncrypt = () => {
     if (!inputText.trim()) {
@@ -113,8 +138,9 @@ function EncryptPage() {
       .post('http://localhost:5000/api/encrypt', { text: inputText })
       .then((response) => {
         setEncryptedText(response.data.encrypted_text);
-        setRounds(response.data.rounds);
-        setEncryptionKey(response.data.key);
+        setEncryptedInput(inputText);
+        fetchRounds(0, inputText, response.data.key_id);
+        setEncryptionKey(response.data.key_id);
         setBitshiftMatrices(response.data.bitshift_matrices);
         setTestResults(null);
         setTestButtonVisible(true);
@@ -161,6 +187,9 @@ function EncryptPage() {
     setInputText('');
     setEncryptedText('');
     setRounds([]);
+    setRoundsBlock(0);
+    setTotalBlocks(0);
+    setEncryptedInput('');
     setEncryptionKey('');
     setBitshiftMatrices([]);
     setTestResults(null);
@@ -609,6 +638,27 @@ Encrypted Text: ${encryptedText}
             <Typography variant="h5" gutterBottom>
               Encryption Flow Visualization
             </Typography>
+            {totalBlocks > 1 && (
+              <Box sx={{ display: 'flex', alignItems: 'center', gap: 2, mb: 2 }}>
+                <Button
+                  variant="outlined"
+                  disabled={roundsBlock === 0}
+                  onClick={() => fetchRounds(roundsBlock - 1, encryptedInput, encryptionKey)}
+                >
+                  Previous Block
+                </Button>
+                <Typography variant="body2">
+                  Block {roundsBlock + 1} of {totalBlocks}
+                </Typography>
+                <Button
+                  variant="outlined"
+                  disabled={roundsBlock >= totalBlocks - 1}
+                  onClick={() => fetchRounds(roundsBlock + 1, encryptedInput, encryptionKey)}
+                >
+                  Next Block
+                </Button>
+              </Box>
+            )}
             <EncryptionFlow rounds={rounds} />
           </Paper>
         </Grid>
@@ -43,7 +43,7 @@ function SideChannelTestPage() {
   const [testType, setTestType] = useState('timing');
   const [testResults, setTestResults] = useState(null);
   const [isTesting, setIsTesting] = useState(false);
-  const [numStrings, setNumStrings] = useState(1); // Number of strings for power consumption analysis
+  const [powerSamples, setPowerSamples] = useState(1); // Power samples, each encrypting 4096 random blocks
   const [snackbarMessage, setSnackbarMessage] = useState('');
   const [openSnackbar, setOpenSnackbar] = useState(false);
 
@@ -56,8 +56,8 @@ function SideChannelTestPage() {
   }, [testType]);
 
   const handleStartTest = () => {
-    if (testType === 'power' && numStrings < 1) {
-      setSnackbarMessage('Number of strings must be greater than 0.');
+    if (testType === 'power' && (powerSamples < 1 || powerSamples > 100)) {
+      setSnackbarMessage('Number of samples must be between 1 and 100.');
       setOpenSnackbar(true);
       return;
     }
@@ -76,7 +76,7 @@ function SideChannelTestPage() {
       body: JSON.stringify({
         input_text: testType === 'power' ? undefined : inputText,
         test_type: testType,
-        num_strings: testType === 'power' ? numStrings : undefined,
+        power_samples: testType === 'power' ? powerSamples : undefined,
       }),
     })
       .then((response) => response.json())
@@ -108,10 +108,33 @@ function SideChannelTestPage() {
     setIsTesting(false);
     setSnackbarMessage('');
     setOpenSnackbar(false);
-    setNumStrings(1); // Reset the number of strings
+    setPowerSamples(1); // Reset the number of samples
   };
 
   const renderChartForTest = (testKey, testData) => {
+    if (!Array.isArray(testData)) {
+      // Summary reports (e.g. the timing leakage test) are shown as they are
+      return (
+        <Paper
+          key={testKey}
+          sx={{
+            p: 3,
+            bgcolor: '#ffffff',
+            borderRadius: 2,
+            boxShadow: '0 4px 10px rgba(0,0,0,0.1)',
+            mt: 3,
+          }}
+        >
+          <Typography variant="h6" gutterBottom>
+            {testKey.charAt(0).toUpperCase() + testKey.slice(1)} Test Results
+          </Typography>
+          <pre style={{ whiteSpace: 'pre-wrap', maxHeight: '400px', overflow: 'auto' }}>
+            {JSON.stringify(testData, null, 2)}
+          </pre>
+        </Paper>
+      );
+    }
+
     if (['timing', 'cache', 'power', 'hamming'].includes(testKey)) {
       const chartOptions = {
         responsive: true,
@@ -285,12 +308,12 @@ function SideChannelTestPage() {
 
             {testType === 'power' ? (
               <TextField
-                label="Number of Strings"
+                label="Number of Samples (4096 blocks each)"
                 type="number"
                 variant="outlined"
                 fullWidth
-                value={numStrings}
-                onChange={(e) => setNumStrings(parseInt(e.target.value) || 1)}
+                value={powerSamples}
+                onChange={(e) => setPowerSamples(parseInt(e.target.value) || 1)}
                 sx={{ mt: 2 }}
               />
             ) : (
@@ -331,7 +354,7 @@ function SideChannelTestPage() {
                 disabled={
                   isTesting ||
                   (testType !== 'power' && !inputText) ||
-                  (testType === 'power' && numStrings < 1)
+                  (testType === 'power' && (powerSamples < 1 || powerSamples > 100))
                 }
                 sx={{ textTransform: 'none' }}
               >